@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+helm-unit benchmark suite.
+
+Generate a synthetic chart with its rendered output stored as a fixture and a test suite spreading
+assertions over every assertion type, then time the hot paths of helm-unit separately: manifest indexing
+and parsing, test loading, JSONPath resolution and assertion evaluation. With --end-to-end the helm-unit
+cli is run as well, against a helm stand-in serving the fixture, so no helm binary is needed.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from ruamel.yaml import YAML
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HELM_UNIT = os.path.join(ROOT, 'src', 'helm-unit.py')
+CHART_NAME = 'bench'
+KINDS = ['Deployment', 'Service', 'ConfigMap']
+
+HELM_STAND_IN = '''#!{python}
+import os
+import sys
+
+command = sys.argv[1] if len(sys.argv) > 1 else ''
+if command == 'version':
+    print('v3.5.0+gbench')
+elif command == 'lint':
+    print('==> Linting {{}}\\n[INFO] Chart.yaml: icon is recommended\\n\\n1 chart(s) linted, 0 chart(s) failed'.format(
+        sys.argv[2]))
+elif command == 'template':
+    with open(os.environ['HELM_UNIT_BENCH_FIXTURE'], 'r') as stream:
+        sys.stdout.write(stream.read())
+else:
+    sys.exit('unsupported helm command: {{}}'.format(' '.join(sys.argv[1:])))
+'''
+
+
+def load_helm_unit():
+    """
+    Import src/helm-unit.py as a module, with the YAML loader its cli entry point creates.
+    :return: module
+    """
+    spec = importlib.util.spec_from_file_location('helm_unit', HELM_UNIT)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['helm_unit'] = module
+    spec.loader.exec_module(module)
+    module.yaml = YAML()
+    return module
+
+
+def resource_name(index):
+    return '{}-{:05d}'.format(CHART_NAME, index)
+
+
+def padding_entry(kind, position):
+    """
+    One entry of the list or map grown to reach the requested document size.
+    :return: (key, value), key is None for list entries
+    """
+    if kind == 'Deployment':
+        return None, {'name': 'VAR_{}'.format(position), 'value': 'x' * 48}
+    if kind == 'Service':
+        return None, {'name': 'port-{}'.format(position), 'port': 1024 + position}
+    return 'key-{}'.format(position), 'v' * 64
+
+
+def synthetic_resource(index, doc_size):
+    """
+    Build one synthetic manifest, padded with configuration data up to about doc_size bytes.
+    :return: dict
+    """
+    kind = KINDS[index % len(KINDS)]
+    metadata = {
+        'name': resource_name(index),
+        'generation': index,
+        'labels': {'app': CHART_NAME, 'app.kubernetes.io/instance': 'tmp', 'tier': 'tier-{}'.format(index % 7)},
+        'annotations': {'empty': '', 'checksum/config': '{:064x}'.format(index)},
+    }
+    manifest = {'apiVersion': 'apps/v1' if kind == 'Deployment' else 'v1', 'kind': kind, 'metadata': metadata}
+    if kind == 'Deployment':
+        manifest['spec'] = {
+            'replicas': index % 5 + 1,
+            'selector': {'matchLabels': {'app': CHART_NAME}},
+            'template': {'metadata': {'labels': {'app': CHART_NAME}}, 'spec': {
+                'serviceAccountName': resource_name(index),
+                'containers': [{'name': 'app', 'image': 'nginx:1.19.{}'.format(index % 10),
+                                'ports': [{'containerPort': 80}],
+                                'env': [], 'resources': {'limits': {'cpu': '100m', 'memory': '128Mi'}}}]}}}
+        padding = manifest['spec']['template']['spec']['containers'][0]['env']
+    elif kind == 'Service':
+        manifest['spec'] = {'type': 'ClusterIP', 'selector': {'app': CHART_NAME}, 'ports': []}
+        padding = manifest['spec']['ports']
+    else:
+        padding = manifest['data'] = {}
+    position = 0
+    while len(json.dumps(manifest)) < doc_size:
+        key, value = padding_entry(kind, position)
+        if key is None:
+            padding.append(value)
+        else:
+            padding[key] = value
+        position += 1
+    return manifest
+
+
+ASSERTION_TEMPLATES = {
+    'equal': lambda index: {'path': 'metadata.name', 'value': resource_name(index)},
+    'notEqual': lambda index: {'path': 'metadata.name', 'value': 'other'},
+    'contains': lambda index: {'path': 'metadata.labels', 'value': {'app': CHART_NAME}},
+    'notContains': lambda index: {'path': 'metadata.labels', 'value': ['app: other']},
+    'isNotEmpty': lambda index: {'path': 'metadata.labels'},
+    'isEmpty': lambda index: {'path': 'metadata.annotations.empty'},
+    'matchValue': lambda index: {'path': 'metadata.name', 'pattern': '^{}-'.format(CHART_NAME)},
+    'notMatchValue': lambda index: {'path': 'metadata.name', 'pattern': 'latest$'},
+    'hasKey': lambda index: {'path': 'metadata.labels', 'key': 'app'},
+    'notHasKey': lambda index: {'path': 'metadata.labels', 'key': 'missing'},
+    'greaterThan': lambda index: {'path': 'metadata.generation', 'value': -1},
+    'lessThan': lambda index: {'path': 'metadata.generation', 'value': 10 ** 9},
+}
+
+
+def generate_suite(directory, resources, doc_size, assertions, assertion_types):
+    """
+    Write a synthetic chart, its rendered output fixture and a test suite of one test file per resource,
+    with the assertions spread round-robin over every assertion type.
+    :return: (chart, tests, fixture)
+    """
+    chart = os.path.join(directory, CHART_NAME)
+    tests = os.path.join(directory, 'unit-tests')
+    fixture = os.path.join(directory, 'rendered.yaml')
+    os.makedirs(os.path.join(chart, 'templates'), exist_ok=True)
+    os.makedirs(tests, exist_ok=True)
+    dumper = YAML(typ='safe', pure=True)
+    dumper.default_flow_style = False
+    with open(os.path.join(chart, 'Chart.yaml'), 'w') as stream:
+        dumper.dump({'apiVersion': 'v2', 'name': CHART_NAME, 'version': '0.1.0'}, stream)
+    with open(fixture, 'w') as rendered:
+        for index in range(resources):
+            template = 'resource-{:05d}.yaml'.format(index)
+            with open(os.path.join(chart, 'templates', template), 'w') as stream:
+                dumper.dump(synthetic_resource(index, doc_size), stream)
+            with open(os.path.join(chart, 'templates', template), 'r') as stream:
+                rendered.write('---\n# Source: {}/templates/{}\n{}'.format(CHART_NAME, template, stream.read()))
+    asserts = [[] for index in range(resources)]
+    for position in range(assertions):
+        index = position % resources
+        type_name = assertion_types[position % len(assertion_types)]
+        template = ASSERTION_TEMPLATES.get(type_name)
+        if template is None:
+            continue
+        asserts[index].append({'name': '{} #{}'.format(type_name, position), 'type': type_name,
+                               'values': [template(index)]})
+    for index, resource_asserts in enumerate(asserts):
+        test = {'tests': [{'description': 'Synthetic test of {}'.format(resource_name(index)),
+                           'type': KINDS[index % len(KINDS)], 'name': resource_name(index),
+                           'asserts': resource_asserts}]}
+        with open(os.path.join(tests, 'test-{:05d}.yaml'.format(index)), 'w') as stream:
+            dumper.dump(test, stream)
+    return chart, tests, fixture
+
+
+def measure(repeat, setup, run):
+    """
+    Time run(setup()) repeat times, setup is not timed.
+    :return: (list of seconds, operations of the last run)
+    """
+    samples = []
+    operations = 0
+    for _ in range(repeat):
+        state = setup()
+        started = time.perf_counter()
+        operations = run(state)
+        samples.append(time.perf_counter() - started)
+    return samples, operations
+
+
+def summarize(samples, operations):
+    best = min(samples)
+    return {'seconds': best, 'median': statistics.median(samples), 'samples': samples,
+            'operations': operations, 'per_second': operations / best if best else None}
+
+
+def run_benchmarks(helm_unit, tests, fixture, repeat):
+    """
+    Time the separate hot paths against the fixture and test suite.
+    :return: dict of benchmark results
+    """
+    with open(fixture, 'r') as stream:
+        output = stream.read()
+    test_files = sorted(os.path.join(tests, file_name) for file_name in os.listdir(tests))
+    results = {}
+
+    def index_manifests(state):
+        return len(helm_unit.load_manifests(output).keys())
+    results['manifest indexing'] = summarize(*measure(repeat, lambda: None, index_manifests))
+
+    def parse_manifests(store):
+        return len(store.manifests())
+    results['manifest parsing'] = summarize(*measure(
+        repeat, lambda: helm_unit.load_manifests(output), parse_manifests))
+
+    def load_tests(state):
+        plans = []
+        for file_name in test_files:
+            with open(file_name, 'r') as stream:
+                plans.append(helm_unit.build_test_plan(helm_unit.yaml.load(stream)))
+        return sum(len(test['asserts']) for plan in plans for test in plan['tests'])
+
+    def cold_caches():
+        helm_unit.compile_path.cache_clear()
+        helm_unit.compile_pattern.cache_clear()
+        helm_unit.parse_expected.cache_clear()
+    results['test loading'] = summarize(*measure(repeat, cold_caches, load_tests))
+
+    cache_dir = tempfile.mkdtemp(prefix='helm-unit-bench-cache-')
+    try:
+        def compile_content(content):
+            return helm_unit.build_test_plan(helm_unit.yaml.load(content))
+
+        def load_cached_tests(state):
+            test_cache = helm_unit.TestPlanCache(helm_unit.RenderCache(cache_dir, 1 << 30), tests)
+            plans = [test_cache.plan(file_name, compile_content) for file_name in test_files]
+            test_cache.save(test_files)
+            return sum(len(test['asserts']) for plan in plans for test in plan['tests'])
+        load_cached_tests(None)
+        results['test loading (plan cache)'] = summarize(*measure(repeat, cold_caches, load_cached_tests))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    plans = []
+    for file_name in test_files:
+        with open(file_name, 'r') as stream:
+            plans.append(helm_unit.build_test_plan(helm_unit.yaml.load(stream)))
+    store = helm_unit.load_manifests(output)
+    store.manifests()
+    targets = [(test, store.get(test['type'], test['name'])) for plan in plans for test in plan['tests']]
+
+    def resolve_paths(state):
+        resolved = 0
+        for test, manifest in targets:
+            for assertion in test['asserts']:
+                for path, compiled_path, arg in assertion.values:
+                    compiled_path.find(manifest)
+                    resolved += 1
+        return resolved
+    results['jsonpath resolution'] = summarize(*measure(repeat, lambda: None, resolve_paths))
+
+    def fresh_store():
+        evaluated = helm_unit.load_manifests(output)
+        evaluated.manifests()
+        return evaluated
+
+    def evaluate(evaluated):
+        checked = 0
+        for plan in plans:
+            report, test_ok, test_ko, timings = helm_unit.evaluate_test_file('bench', plan, evaluated, CHART_NAME)
+            if test_ko:
+                raise RuntimeError('synthetic test failed:\n{}'.format(report))
+            checked += test_ok
+        return checked
+    results['assertion evaluation'] = summarize(*measure(repeat, fresh_store, evaluate))
+    return results
+
+
+def run_end_to_end(directory, chart, tests, fixture, repeat, jobs):
+    """
+    Run the helm-unit cli against a helm stand-in serving the fixture.
+    :return: dict of benchmark results
+    """
+    bin_dir = os.path.join(directory, 'bin')
+    os.makedirs(bin_dir, exist_ok=True)
+    stand_in = os.path.join(bin_dir, 'helm')
+    with open(stand_in, 'w') as stream:
+        stream.write(HELM_STAND_IN.format(python=sys.executable))
+    os.chmod(stand_in, 0o755)
+    environment = dict(os.environ, PATH=bin_dir + os.pathsep + os.environ.get('PATH', ''),
+                       HELM_UNIT_BENCH_FIXTURE=fixture, HELM_UNIT_CACHE_DIR=os.path.join(directory, 'cache'))
+    profile_file = os.path.join(directory, 'profile.json')
+    samples = []
+    phases = {}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, HELM_UNIT, '--chart', chart, '--tests', tests, '--no-cache',
+                        '--jobs', str(jobs), '--profile-json', profile_file],
+                       env=environment, check=True, stdout=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - started)
+        with open(profile_file, 'r') as stream:
+            for phase, seconds in json.load(stream)['phases'].items():
+                phases.setdefault(phase, []).append(seconds)
+    results = {'end-to-end': summarize(samples, 1)}
+    for phase, phase_samples in phases.items():
+        results['end-to-end {}'.format(phase)] = summarize(phase_samples, 1)
+    return results
+
+
+def compare(results, baseline, max_regression):
+    """
+    Compare best times with a baseline, a benchmark regresses when it is slower than its threshold allows.
+    :return: list of (name, baseline seconds, seconds, threshold)
+    """
+    thresholds = baseline.get('thresholds') or {}
+    regressions = []
+    for name, result in results.items():
+        previous = (baseline.get('results') or {}).get(name)
+        if previous is None:
+            continue
+        threshold = thresholds.get(name, max_regression)
+        if result['seconds'] > previous['seconds'] * (1 + threshold):
+            regressions.append((name, previous['seconds'], result['seconds'], threshold))
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark helm-unit hot paths on a synthetic chart.')
+    arg_parser.add_argument('--resources', metavar='N', type=int, default=300,
+                            help='Number of rendered resources (default: 300)')
+    arg_parser.add_argument('--doc-size', metavar='BYTES', dest='doc_size', type=int, default=2048,
+                            help='Approximate size of each rendered document (default: 2048)')
+    arg_parser.add_argument('--assertions', metavar='M', type=int, default=3000,
+                            help='Number of assertions spread over all assertion types (default: 3000)')
+    arg_parser.add_argument('--repeat', metavar='R', type=int, default=5,
+                            help='Runs per benchmark, the best time is compared (default: 5)')
+    arg_parser.add_argument('--end-to-end', dest='end_to_end', action='store_true',
+                            help='Also time the helm-unit cli against a helm stand-in serving the fixture')
+    arg_parser.add_argument('--jobs', metavar='N', type=int, default=1,
+                            help='--jobs passed to the helm-unit cli in --end-to-end runs (default: 1)')
+    arg_parser.add_argument('--workdir', metavar='DIR',
+                            help='Generate the suite in DIR and keep it (default: a temporary directory)')
+    arg_parser.add_argument('--output', metavar='FILE', help='Write the results as JSON to FILE')
+    arg_parser.add_argument('--baseline', metavar='FILE', help='Fail when slower than the results in FILE')
+    arg_parser.add_argument('--max-regression', metavar='RATIO', dest='max_regression', type=float, default=0.25,
+                            help='Allowed slowdown against --baseline, per-benchmark "thresholds" in the '
+                                 'baseline file take precedence (default: 0.25)')
+    args = arg_parser.parse_args()
+
+    helm_unit = load_helm_unit()
+    assertion_types = sorted(helm_unit.ASSERTIONS)
+    missing = [type_name for type_name in assertion_types if type_name not in ASSERTION_TEMPLATES]
+    if missing:
+        print('No synthetic assertion for type(s) {}, they are not benchmarked'.format(', '.join(missing)))
+    directory = args.workdir or tempfile.mkdtemp(prefix='helm-unit-bench-')
+    try:
+        generated = time.perf_counter()
+        chart, tests, fixture = generate_suite(directory, args.resources, args.doc_size, args.assertions,
+                                               assertion_types)
+        print('==> Generated {} resources and {} assertions in {:.3f}s\n'.format(
+            args.resources, args.assertions, time.perf_counter() - generated))
+        results = run_benchmarks(helm_unit, tests, fixture, args.repeat)
+        if args.end_to_end:
+            results.update(run_end_to_end(directory, chart, tests, fixture, args.repeat, args.jobs))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    for name, result in results.items():
+        rate = '' if result['operations'] <= 1 else '{:>14,.0f} ops/s'.format(result['per_second'])
+        print('{:<40} {:>10.4f}s {}'.format(name, result['seconds'], rate))
+    report = {
+        'config': {'resources': args.resources, 'doc_size': args.doc_size, 'assertions': args.assertions,
+                   'repeat': args.repeat, 'jobs': args.jobs, 'python': sys.version.split()[0]},
+        'thresholds': {},
+        'results': results,
+    }
+    if args.baseline:
+        with open(args.baseline, 'r') as stream:
+            baseline = json.load(stream)
+        report['thresholds'] = baseline.get('thresholds') or {}
+        regressions = compare(results, baseline, args.max_regression)
+    else:
+        regressions = []
+    if args.output:
+        with open(args.output, 'w') as stream:
+            json.dump(report, stream, indent=2)
+    if regressions:
+        print()
+        for name, previous, current, threshold in regressions:
+            print('X {} regressed: {:.4f}s -> {:.4f}s (allowed +{:.0%})'.format(name, previous, current, threshold))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,25 +1,95 @@
 import argparse
+import concurrent.futures
+import contextlib
+import difflib
+import fnmatch
+import json
+import functools
+import hashlib
+import io
+import multiprocessing
 import os
+import pickle
+import shutil
+import zlib
 import subprocess
-from datetime import datetime
+import threading
+from datetime import date, datetime
 from ruamel.yaml import YAML
 from jsonpath_ng import parse
 import time
 import sys
 import glob
-from ruamel.yaml.compat import StringIO
 import re
 from colorama import Fore, Style
 
+PATH_CACHE_SIZE = 4096
+RELEASE_NAME = 'tmp'
+RENDER_FLAGS = ['--validate', '--is-upgrade']
+OFFLINE_RENDER_FLAGS = ['--is-upgrade']
+SCHEMA_INDEX_FORMAT = 1
+RENDER_CACHE_FORMAT = 3
+TEST_CACHE_FORMAT = 1
+DEFAULT_VARIANT = {'name': 'default', 'values': [], 'set': []}
+
 
 class Unit:
+    def __init__(self, args_cli=None, helm_version=None):
+        self.args_cli = args_cli
+        self.helm_version = helm_version
+        self.helm_pool = None
+        self.render_pool = None
+
     def initialize_unit(self):
         """
         Helm Unit Initializer
         """
-        self.initialize_arg_parser()
-        check_version()
-        self.tests_loader()
+        if self.args_cli is None:
+            self.initialize_arg_parser()
+        self.configure()
+        self.start_helm()
+        if self.helm_version is None:
+            with self.profiler.phase('check_version'):
+                self.helm_version = check_version(self.version_future.result())
+        with self.profiler.phase('test loading'):
+            self.tests_loader()
+
+    def start_helm(self):
+        """
+        Launch helm version and lint together, results are consumed in order later. Renders get their own
+        pool of --jobs workers, so version and lint never count against that bound.
+        """
+        self.start_pools()
+        self.helm_binary = helm_fingerprint()
+        self.version_future = None if self.helm_version else self.helm_pool.submit(
+            helm_version, self.helm_binary, self.render_cache is not None)
+        self.lint_result = None
+        self.lint_future = None
+        if self.render_cache is not None:
+            with self.profiler.phase('render cache'):
+                self.chart_hash = chart_digest(self.chart, [self.tests])
+                self.lint_key = lint_cache_key(self.chart_hash, self.helm_binary)
+                self.lint_result = self.render_cache.load_lint(self.lint_key)
+        if self.lint_result is None:
+            self.lint_future = self.helm_pool.submit(run_helm, ['lint', self.chart])
+
+    def start_pools(self):
+        """
+        Create the helm and render worker threads, unless they are running.
+        """
+        if self.helm_pool is None:
+            self.helm_pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+            self.render_pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.args_cli.jobs)
+
+    def stop_helm(self):
+        """
+        Release the helm worker threads.
+        """
+        for pool in (self.helm_pool, self.render_pool):
+            if pool is not None:
+                pool.shutdown()
+        self.helm_pool = None
+        self.render_pool = None
 
     def initialize_arg_parser(self):
         """
@@ -29,20 +99,62 @@ class Unit:
         self.arg_parser = argparse.ArgumentParser(
             description='Run unit-test on chart locally without deploying the release.', prog='helm unit',
             usage='%(prog)s [CHART-DIR] [TEST-DIR]')
-        self.arg_parser.add_argument('--chart', metavar='CHART-PATH', dest='chart', type=str, required=True,
+        self.arg_parser.add_argument('--chart', metavar='CHART-PATH', dest='chart', type=str,
                                      help='Specify chart directory')
-        self.arg_parser.add_argument('--tests', metavar='TESTS-PATH', dest='tests', type=str, required=True,
+        self.arg_parser.add_argument('--tests', metavar='TESTS-PATH', dest='tests', type=str,
                                      help='Specify Unit tests directory')
+        self.arg_parser.add_argument('--charts', metavar='ROOT-OR-FILE', dest='charts', type=str,
+                                     help='Test every chart found below a directory, or listed in a YAML file, '
+                                          'on one shared worker pool')
+        self.arg_parser.add_argument('--matrix', metavar='MATRIX-FILE', dest='matrix', type=str,
+                                     help='Specify a YAML file of values variants to run every test against')
+        self.arg_parser.add_argument('--jobs', metavar='N', dest='jobs', type=int, default=os.cpu_count() or 1,
+                                     help='Maximum number of concurrent helm renders and test workers '
+                                          '(default: number of CPUs)')
+        self.arg_parser.add_argument('--only-tested', dest='only_tested', action='store_true',
+                                     help='Only keep rendered resources targeted by a test')
+        self.arg_parser.add_argument('--watch', dest='watch', action='store_true',
+                                     help='Keep running and re-run affected tests when the chart or tests change')
+        self.arg_parser.add_argument('--watch-interval', metavar='SECONDS', dest='watch_interval', type=float,
+                                     default=0.5, help='Polling interval of --watch (default: 0.5)')
+        self.arg_parser.add_argument('--schemas', metavar='SCHEMAS-PATH', dest='schemas', type=str,
+                                     help='Validate manifests offline against local Kubernetes/CRD JSON schemas '
+                                          'instead of helm template --validate')
+        self.arg_parser.add_argument('--cache-stats', dest='cache_stats', action='store_true',
+                                     help='Print compiled JSONPath and test plan cache statistics')
+        self.arg_parser.add_argument('--no-cache', dest='no_cache', action='store_true',
+                                     help='Always lint and render the chart and compile the tests, bypassing the caches')
+        self.arg_parser.add_argument('--cache-size', metavar='MB', dest='cache_size', type=int, default=100,
+                                     help='Maximum size of the render cache in megabytes (default: 100)')
+        self.arg_parser.add_argument('--profile', dest='profile', action='store_true',
+                                     help='Print wall time per phase, test file and assertion type')
+        self.arg_parser.add_argument('--profile-json', metavar='FILE', dest='profile_json', type=str,
+                                     help='Write the profile as JSON to FILE')
         self.arg_parser.add_argument('--version', action='version',
                                      version='BuildInfo{Timestamp:' + str(datetime.now()) + ', version: 0.1.5}',
                                      help='Print version information')
         try:
             self.args_cli = self.arg_parser.parse_args()
-            self.chart = self.args_cli.chart
-            self.tests = self.args_cli.tests
-            return self.args_cli
         except IOError as err:
             self.arg_parser.error(str(err))
+        if self.args_cli.charts:
+            if self.args_cli.chart or self.args_cli.tests or self.args_cli.watch:
+                self.arg_parser.error('--charts cannot be combined with --chart, --tests or --watch')
+        elif not self.args_cli.chart or not self.args_cli.tests:
+            self.arg_parser.error('the following arguments are required: --chart, --tests (or --charts)')
+        return self.args_cli
+
+    def configure(self):
+        """
+        Set up the chart, tests, profiler and render cache from the parsed cli arguments.
+        """
+        self.chart = self.args_cli.chart
+        self.tests = self.args_cli.tests
+        self.profiler = Profiler()
+        self.render_flags = OFFLINE_RENDER_FLAGS if self.args_cli.schemas else RENDER_FLAGS
+        self.render_cache = None if self.args_cli.no_cache else RenderCache(
+            cache_home(), self.args_cli.cache_size * 1024 * 1024)
+        self.test_cache = None if self.args_cli.no_cache else TestPlanCache(self.render_cache, self.tests)
 
     def tests_loader(self):
         """
@@ -50,13 +162,14 @@ class Unit:
         """
         try:
             if os.path.exists(self.tests) and os.path.isdir(self.tests):
-                if os.listdir(self.tests):
-                    files = glob.glob(self.tests + '/*.yaml')
+                file_names = self.test_files()
+                if file_names:
                     self.dic_tests = {}
-                    for file_name in files:
-                        with open(file_name, 'r') as stream:
-                            test_content = yaml.load(stream)
-                        self.dic_tests[file_name.replace(self.tests + '/', '')] = test_content
+                    for file_name in file_names:
+                        self.dic_tests[self.test_key(file_name)] = self.load_test_file(file_name)
+                    if self.test_cache is not None:
+                        self.test_cache.save(file_names)
+                    self.variants_loader()
                 else:
                     print('{} X {} No yaml test file was found in {} directory'.format(
                         Fore.RED, Style.RESET_ALL, self.tests))
@@ -69,14 +182,200 @@ class Unit:
             print('{} X {} {}'.format(Fore.RED, Style.RESET_ALL, err))
             sys.exit(1)
 
+    def test_files(self):
+        """
+        List unit test files in the tests directory and its subdirectories.
+        :return: list
+        """
+        return sorted(glob.glob(self.tests + '/**/*.yaml', recursive=True) +
+                      glob.glob(self.tests + '/**/*.yml', recursive=True))
+
+    def test_key(self, file_name):
+        return file_name.replace(self.tests + '/', '')
+
+    def load_test_file(self, file_name):
+        """
+        Read and compile a single unit test file, unless an unchanged compiled plan is cached.
+        :return: dict
+        """
+        try:
+            if self.test_cache is not None:
+                return self.test_cache.plan(file_name, lambda content: build_test_plan(yaml.load(content)))
+            with open(file_name, 'r') as stream:
+                return build_test_plan(yaml.load(stream))
+        except ValueError as err:
+            raise ValueError('{} :: {}'.format(self.test_key(file_name), err))
+
+    def variants_loader(self):
+        """
+        Resolve the values variants of every test file, from the file itself or from --matrix.
+        """
+        self.variants = {}
+        sources = {}
+
+        def register(variant, source):
+            variant = normalize_variant(variant, self.chart)
+            defined = self.variants.setdefault(variant['name'], variant)
+            if defined != variant:
+                raise ValueError('values variant {} is defined differently in {} and {}'.format(
+                    variant['name'], sources[variant['name']], source))
+            sources.setdefault(variant['name'], source)
+            return variant['name']
+
+        matrix = []
+        if self.args_cli.matrix:
+            with open(self.args_cli.matrix, 'r') as stream:
+                matrix = (yaml.load(stream) or {}).get('variants') or []
+        matrix_names = [register(variant, self.args_cli.matrix) for variant in matrix]
+        for file_name, test_plan in self.dic_tests.items():
+            if test_plan['variants']:
+                test_plan['variant_names'] = [register(variant, file_name) for variant in test_plan['variants']]
+            else:
+                test_plan['variant_names'] = matrix_names or [register(DEFAULT_VARIANT, file_name)]
+
+    def tested_resources(self):
+        """
+        Set of (kind, name) targeted by the loaded tests.
+        :return: set
+        """
+        return {(test['type'], test['name']) for test_plan in self.dic_tests.values() for test in test_plan['tests']}
+
+    def test_runs(self):
+        """
+        List every (test file, variant) pair to evaluate, in file order.
+        :return: list
+        """
+        return [(file_name, variant_name, test_plan)
+                for file_name, test_plan in self.dic_tests.items()
+                for variant_name in test_plan['variant_names']]
+
+
+def normalize_variant(variant, chart):
+    """
+    Validate a values variant and resolve its values files against the chart directory.
+    :return: dict
+    """
+    if not isinstance(variant, dict) or 'name' not in variant:
+        raise ValueError('values variant {} does not have a name'.format(variant))
+    values_files = variant.get('values') or []
+    if isinstance(values_files, str):
+        values_files = [values_files]
+    resolved = []
+    for values_file in values_files:
+        chart_relative = os.path.join(chart, values_file)
+        resolved.append(chart_relative if os.path.isfile(chart_relative) else values_file)
+    set_values = variant.get('set') or []
+    if isinstance(set_values, dict):
+        set_values = ['{}={}'.format(key, value) for key, value in set_values.items()]
+    elif isinstance(set_values, str):
+        set_values = [set_values]
+    return {'name': str(variant['name']), 'values': resolved, 'set': [str(value) for value in set_values]}
+
+
+@functools.lru_cache(maxsize=PATH_CACHE_SIZE)
+def compile_path(expression):
+    """
+    Compile a JSONPath expression, each distinct expression is parsed once per process.
+    :return: jsonpath expression
+    """
+    return parse(expression)
+
+
+def path_cache_stats():
+    """
+    Format compiled JSONPath cache counters.
+    :return: str
+    """
+    info = compile_path.cache_info()
+    return 'hits: {}, misses: {}, size: {}/{}'.format(info.hits, info.misses, info.currsize, info.maxsize)
+
+
+def build_test_plan(test_content):
+    """
+    Compile a unit test file into a plan of its test entries, validating and compiling every assertion once.
+    :return: dict
+    """
+    if not isinstance(test_content, dict) or not test_content.get('tests'):
+        raise ValueError('test file does not define any tests')
+    return {
+        'variants': test_content.get('variants') or [],
+        'tests': [build_test_entry(position, test) for position, test in enumerate(test_content['tests'])]
+    }
+
+
+def build_test_entry(position, test):
+    """
+    Compile one entry of a test file's tests list.
+    :return: dict
+    """
+    if not isinstance(test, dict) or not test.get('type') or not test.get('name'):
+        raise ValueError('test #{} does not have a type and a name'.format(position + 1))
+    return {
+        'type': test['type'],
+        'name': test['name'],
+        'namespace': test.get('namespace'),
+        'apiVersion': test.get('apiVersion'),
+        'asserts': [compile_assertion(k) for k in compile_path('$.asserts[*]').find(test)]
+    }
+
+
+def run_helm(args):
+    """
+    Run a helm command.
+    :return: (returncode, output)
+    """
+    process = subprocess.Popen(['helm'] + args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    out, err = process.communicate()
+    return process.returncode, out
+
+
+def helm_fingerprint():
+    """
+    Identify the helm binary by resolved path, size and modification time.
+    :return: str
+    """
+    path = shutil.which('helm')
+    if path is None:
+        return 'helm'
+    stat = os.stat(path)
+    return '{}:{}:{}'.format(os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+
 
-def check_version():
+def helm_version(fingerprint, use_cache=True):
+    """
+    Get `helm version --short` output, cached per helm binary fingerprint.
+    :return: bytes
+    """
+    cache_file = os.path.join(cache_home(), 'versions.json')
+    versions = {}
+    if use_cache:
+        try:
+            with open(cache_file, 'r') as stream:
+                versions = json.load(stream)
+        except (OSError, ValueError):
+            versions = {}
+        if fingerprint in versions:
+            return versions[fingerprint].encode('utf-8')
+    returncode, out = run_helm(['version', '--short'])
+    if use_cache and returncode == 0:
+        versions[fingerprint] = str(out, 'utf-8')
+        try:
+            os.makedirs(cache_home(), exist_ok=True)
+            tmp_path = '{}.{}.tmp'.format(cache_file, os.getpid())
+            with open(tmp_path, 'w') as stream:
+                json.dump(versions, stream)
+            os.replace(tmp_path, cache_file)
+        except OSError:
+            pass
+    return out
+
+
+def check_version(out):
     """
     Validate helm binary version.
+    :return: helm version
     """
     try:
-        version = subprocess.Popen(['helm', 'version', '--short'], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-        out, err = version.communicate()
         output = str(out, 'utf-8').split('+')
         compatibility_version = output[0].split('.')[1]
         if output[0].startswith('v3'):
@@ -86,6 +385,7 @@ def check_version():
                 print('{} X {} You are using an incompatible version, '
                       'see https://github.com/HamzaZo/helm-unit#prerequisite'.format(Fore.RED, Style.RESET_ALL))
                 sys.exit(1)
+        return output[0].strip()
     except ValueError as erv:
         print('{} X {} Unable to find a supported helm version :: {}'.format(
             Fore.RED, Style.RESET_ALL, erv))
@@ -93,22 +393,31 @@ def check_version():
 
 
 class Linting(Unit):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, args_cli=None, helm_version=None):
+        super().__init__(args_cli, helm_version)
 
     def linting_chart(self):
         """
         Chart syntax validator
         """
+        self.initialize_unit()
+        self.check_chart_syntax()
+
+    def check_chart_syntax(self):
+        """
+        Report the helm lint result started by start_helm.
+        """
         try:
-            self.initialize_unit()
             if "templates" in os.listdir(self.chart):
                 print('√ Validating chart syntax..\n')
-                time.sleep(1)
-                check_syntax = subprocess.Popen(['helm', 'lint', self.chart], stdout=subprocess.PIPE,
-                                                stderr=subprocess.STDOUT)
-                out_syn, out_err = check_syntax.communicate()
-                if check_syntax.returncode == 0:
+                if self.lint_result is None:
+                    with self.profiler.phase('helm lint'):
+                        self.lint_result = self.lint_future.result()
+                    if self.render_cache is not None and self.lint_result[0] == 0:
+                        with self.profiler.phase('render cache'):
+                            self.render_cache.save_lint(self.lint_key, self.lint_result)
+                returncode, out_syn = self.lint_result
+                if returncode == 0:
                     msg = str(out_syn, 'utf-8').replace('[INFO] Chart.yaml: icon is recommended',
                                                         'PASS').replace(
                         '1 chart(s) linted, 0 chart(s) failed', '').strip()
@@ -129,275 +438,2074 @@ class Linting(Unit):
             sys.exit(1)
 
 
-def assert_pre_check(asserts_test, kind_name):
+def assert_pre_check(asserts_test, kind_name, report=None):
     """
     validate asserts
     :return: bool
     """
-    match_types = {
-        "equal": ["path", "value"],
-        "notEqual": ["path", "value"],
-        "contains": ["path", "value"],
-        "notContains": ["path", "value"],
-        "matchValue": ["path", "pattern"],
-        "notMatchValue": ["path", "pattern"],
-        "isEmpty": ["path"],
-        "isNotEmpty": ["path"]
-    }
+    match_types = {name: assertion_type.params for name, assertion_type in ASSERTIONS.items()}
 
     if 'type' not in asserts_test.value:
         print(f'{Fore.RED}X {Style.RESET_ALL}Test:{Fore.RED} {kind_name}'
-              f'{Style.RESET_ALL} does not have an assert type\n')
+              f'{Style.RESET_ALL} does not have an assert type\n', file=report)
         return False
     if 'values' not in asserts_test.value:
         print(f'{Fore.RED}X {Style.RESET_ALL}Test:{Fore.RED} {kind_name} '
-              f'{Style.RESET_ALL} does not have an assert values\n')
+              f'{Style.RESET_ALL} does not have an assert values\n', file=report)
         return False
     if asserts_test.value['type'] in match_types:
         for match_item in match_types[asserts_test.value['type']]:
             for item in asserts_test.value['values']:
                 if match_item not in item:
-                    print(f'{Fore.RED}X {Style.RESET_ALL}Test: {kind_name} does not have {match_item} in assert type\n')
+                    print(f'{Fore.RED}X {Style.RESET_ALL}Test: {kind_name} does not have {match_item} in assert type\n',
+                          file=report)
                     return False
                 for val in item:
                     if val not in match_types[asserts_test.value['type']]:
                         print(f'{Fore.RED}X {Style.RESET_ALL}Test: {kind_name} contains unsupported value {val} '
-                              f'- We only support {match_types[asserts_test.value["type"]]}\n')
+                              f'- We only support {match_types[asserts_test.value["type"]]}\n', file=report)
                         return False
     return True
 
 
-class YamlDump(YAML):
+def freeze(value):
     """
-    Dump a YAML element, to take it as string and not to interpret the content of data.
+    Hashable, order-insensitive form of parsed YAML data.
+    :return: hashable value
     """
+    if isinstance(value, dict):
+        return frozenset((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, set):
+        return frozenset(freeze(item) for item in value)
+    return value
 
-    def dump(self, data, stream=None, **kw):
-        inefficient = False
-        if stream is None:
-            inefficient = True
-            stream = StringIO()
-        YAML.dump(self, data, stream, **kw)
-        if inefficient:
-            return stream.getvalue()
 
+@functools.lru_cache(maxsize=PATH_CACHE_SIZE)
+def parse_expected(text):
+    """
+    Parse a `key: value` style expectation, text that is not valid YAML is kept as a plain string.
+    :return: parsed value
+    """
+    try:
+        return YAML(typ='safe').load(text)
+    except Exception:
+        return text
 
-class Testing(Linting):
-    def __init__(self):
-        super().__init__()
 
-    def render_chart(self):
+def expected_value(expected):
+    """
+    Structural form of a contains/notContains expected value.
+    :return: parsed value
+    """
+    if isinstance(expected, str):
+        return parse_expected(expected)
+    return expected
+
+
+class ContainmentIndex:
+    """
+    Hashed key/value view of a manifest subtree answering structural subset queries.
+    """
+
+    def __init__(self, node, indexes):
+        self.node = node
+        self.indexes = indexes
+        if isinstance(node, dict):
+            self.members = {(key, freeze(item)) for key, item in node.items()}
+        elif isinstance(node, list):
+            self.members = {freeze(item) for item in node}
+        else:
+            self.members = {freeze(node)}
+
+    def child(self, node):
+        index = self.indexes.get(id(node))
+        if index is None:
+            index = self.indexes[id(node)] = ContainmentIndex(node, self.indexes)
+        return index
+
+    def contains(self, expected):
         """
-        Render chart templates locally.
+        Check whether expected is a (nested) subset of the subtree.
+        :return: bool
         """
-        self.linting_chart()
-        try:
-            release = subprocess.Popen(['helm', 'template', 'tmp', self.chart, '--validate', '--is-upgrade'],
-                                       stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-            out_rel, err_rel = release.communicate()
-            output = str(out_rel, 'utf-8')
-            split_manifests = output.split('---')
-            self.mydict = {}
-            if release.returncode == 0:
-                for k in split_manifests:
-                    chart_templates = yaml.load(k)
-                    if chart_templates is not None:
-                        if chart_templates['kind'] not in self.mydict:
-                            self.mydict[chart_templates['kind']] = {}
-
-                for k in split_manifests:
-                    chart_templates = yaml.load(k)
-                    if chart_templates is not None:
-                        metadata = chart_templates['metadata']['name']
-                        find_spec_value = parse('$[*]').find(chart_templates)
-                        self.mydict[chart_templates['kind']][metadata] = find_spec_value[0].value
-            else:
-                print(' {} X {} {} '.format(
-                    Fore.RED, Style.RESET_ALL, str(out_rel, 'utf-8')))
-                sys.exit(1)
+        if isinstance(self.node, dict):
+            if isinstance(expected, dict):
+                for key, item in expected.items():
+                    if (key, freeze(item)) in self.members:
+                        continue
+                    if key not in self.node or not isinstance(item, (dict, list)) or \
+                            not self.child(self.node[key]).contains(item):
+                        return False
+                return True
+            if isinstance(expected, list):
+                return all(self.contains(item) for item in expected)
+            return expected in self.node
+        if isinstance(self.node, list):
+            if isinstance(expected, list):
+                return all(self.contains(item) for item in expected)
+            if freeze(expected) in self.members:
+                return True
+            return isinstance(expected, dict) and any(
+                self.child(item).contains(expected) for item in self.node if isinstance(item, (dict, list)))
+        return freeze(expected) in self.members
+
 
+class AssertionType:
+    """
+    A registered assertion type: its parameters, an optional compile step and its check.
+    """
+
+    def __init__(self, name, params, check, compile_item=None):
+        self.name = name
+        self.params = params
+        self.check = check
+        self.compile_item = compile_item
+
+
+ASSERTIONS = {}
+
+
+def register_assertion(name, params, compile_item=None):
+    """
+    Register check(find_spec, arg, manifests) as an assertion type. The check returns a list of
+    (detail, passed) results, arg is the assert value compiled by compile_item at load time.
+    """
+    def decorator(check):
+        ASSERTIONS[name] = AssertionType(name, params, check, compile_item)
+        return check
+    return decorator
+
+
+class CompiledAssertion:
+    """
+    An assertion validated and compiled once when its test file is loaded.
+    """
+
+    def __init__(self, name, type_name, values, error=None):
+        self.name = name
+        self.type_name = type_name
+        self.values = values
+        self.error = error
+
+
+def compile_assertion(asserts_test):
+    """
+    Validate an assert and compile its paths and values.
+    :return: CompiledAssertion
+    """
+    name = asserts_test.value.get('name')
+    type_name = asserts_test.value.get('type')
+    pre_check_report = io.StringIO()
+    if not assert_pre_check(asserts_test, name, pre_check_report):
+        return CompiledAssertion(name, type_name, [], pre_check_report.getvalue())
+    assertion_type = ASSERTIONS.get(type_name)
+    values = []
+    for item in asserts_test.value['values']:
+        # Invalid paths and values are reported when the assertion is evaluated.
+        try:
+            compiled_path = compile_path('$.' + str(item['path']))
         except Exception as err:
-            print('{} X {} rendering {} chart templates failed :: {}'.format(
-                Fore.RED, Style.RESET_ALL, self.chart, err))
-            sys.exit(1)
+            compiled_path = err
+        try:
+            arg = assertion_type.compile_item(item) if assertion_type and assertion_type.compile_item else item
+        except Exception as err:
+            arg = err
+        values.append((item['path'], compiled_path, arg))
+    return CompiledAssertion(name, type_name, values)
 
-    def run_test(self):
+
+@functools.lru_cache(maxsize=PATH_CACHE_SIZE)
+def compile_pattern(pattern):
+    """
+    Compile a regex once per process.
+    :return: re.Pattern
+    """
+    return re.compile(pattern)
+
+
+def item_pattern(item):
+    return compile_pattern(str(item['pattern']))
+
+
+def item_expected_values(item):
+    if isinstance(item['value'], str):
+        return item['value']
+    expected_values = item['value'] if isinstance(item['value'], list) else [item['value']]
+    return [(expected if isinstance(expected, str) else json.dumps(expected, default=str), expected_value(expected))
+            for expected in expected_values]
+
+
+@register_assertion('equal', ['path', 'value'])
+def check_equal(find_spec, item, manifests):
+    return [(None, find_spec[0].value is not None and find_spec[0].value == item['value'])]
+
+
+@register_assertion('notEqual', ['path', 'value'])
+def check_not_equal(find_spec, item, manifests):
+    return [(None, find_spec[0].value is not None and find_spec[0].value != item['value'])]
+
+
+def check_containment(find_spec, expected_values, manifests):
+    if isinstance(expected_values, str):
+        return [(None, expected_values in [match.value for match in find_spec])]
+    containment = manifests.containment(find_spec[0].value)
+    return [(expected, containment.contains(parsed)) for expected, parsed in expected_values]
+
+
+@register_assertion('contains', ['path', 'value'], item_expected_values)
+def check_contains(find_spec, expected_values, manifests):
+    return check_containment(find_spec, expected_values, manifests)
+
+
+@register_assertion('notContains', ['path', 'value'], item_expected_values)
+def check_not_contains(find_spec, expected_values, manifests):
+    return [(detail, not passed) for detail, passed in check_containment(find_spec, expected_values, manifests)]
+
+
+@register_assertion('isNotEmpty', ['path'])
+def check_is_not_empty(find_spec, item, manifests):
+    return [(None, find_spec[0].value is not None and len(find_spec[0].value) > 0)]
+
+
+@register_assertion('isEmpty', ['path'])
+def check_is_empty(find_spec, item, manifests):
+    return [(None, len(find_spec[0].value) == 0)]
+
+
+@register_assertion('matchValue', ['path', 'pattern'], item_pattern)
+def check_match_value(find_spec, pattern, manifests):
+    return [(None, pattern.search(find_spec[0].value) is not None)]
+
+
+@register_assertion('notMatchValue', ['path', 'pattern'], item_pattern)
+def check_not_match_value(find_spec, pattern, manifests):
+    return [(None, pattern.search(find_spec[0].value) is None)]
+
+
+@register_assertion('hasKey', ['path', 'key'])
+def check_has_key(find_spec, item, manifests):
+    return [(None, isinstance(find_spec[0].value, dict) and item['key'] in find_spec[0].value)]
+
+
+@register_assertion('notHasKey', ['path', 'key'])
+def check_not_has_key(find_spec, item, manifests):
+    return [(None, isinstance(find_spec[0].value, dict) and item['key'] not in find_spec[0].value)]
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def item_number(item):
+    if not is_number(item['value']):
+        raise ValueError('value {!r} is not a number'.format(item['value']))
+    return item['value']
+
+
+@register_assertion('greaterThan', ['path', 'value'], item_number)
+def check_greater_than(find_spec, bound, manifests):
+    return [(None, is_number(find_spec[0].value) and find_spec[0].value > bound)]
+
+
+@register_assertion('lessThan', ['path', 'value'], item_number)
+def check_less_than(find_spec, bound, manifests):
+    return [(None, is_number(find_spec[0].value) and find_spec[0].value < bound)]
+
+
+DOCUMENT_SEPARATOR = re.compile(r'^---[ \t]*(?:#[^\n]*)?$\n?', re.M)
+HEADER_FIELD = re.compile(r'^(apiVersion|kind|metadata):[ \t]*(.*?)[ \t]*$', re.M)
+METADATA_FIELD = re.compile(r'^([ \t]+)(name|namespace):[ \t]*(.*?)[ \t]*$')
+PLAIN_SCALAR = re.compile(r'^[A-Za-z_./-][A-Za-z0-9_./-]*$')
+YAML_KEYWORDS = {'true', 'false', 'null', 'yes', 'no', 'on', 'off', '~'}
+yaml_loaders = threading.local()
+
+
+def parse_document(text):
+    """
+    Parse a single YAML document with a per-thread safe loader (C-accelerated when available).
+    :return: parsed document
+    """
+    loader = getattr(yaml_loaders, 'safe', None)
+    if loader is None:
+        loader = yaml_loaders.safe = YAML(typ='safe')
+    return loader.load(text)
+
+
+HEADER_UNSAFE_START = ('|', '>', "'", '"', '[', '{', '&', '*', '!')
+
+
+def header_scalar(value):
+    """
+    Read a plain scalar from a header line without running the YAML parser for simple values.
+    :return: scalar
+    """
+    if PLAIN_SCALAR.match(value) and value.lower() not in YAML_KEYWORDS:
+        return value
+    return parse_document('value: ' + value)['value']
+
+
+def line_indent(line):
+    return len(line) - len(line.lstrip())
+
+
+def next_content_line(lines, position):
+    """
+    First line after position that is neither blank nor a comment.
+    :return: str or None
+    """
+    for line in lines[position + 1:]:
+        if line.strip() and not line.lstrip().startswith('#'):
+            return line
+    return None
+
+
+def document_header(text):
+    """
+    Cheaply extract the (apiVersion, kind, namespace, name) identity of a manifest. Values that are empty,
+    quoted, block or flow scalars, anchors, aliases, tags or continued on the next line need the YAML parser.
+    :return: tuple, or None when the document needs a full parse to be identified
+    """
+    lines = text.split('\n')
+    fields = {}
+    metadata_line = None
+    for position, line in enumerate(lines):
+        match = HEADER_FIELD.match(line)
+        if match is None:
+            continue
+        if match.group(1) == 'metadata':
+            if match.group(2) != '':
+                return None
+            metadata_line = position
+        else:
+            fields[match.group(1)] = (match.group(2), 0, position)
+    if 'kind' not in fields or 'apiVersion' not in fields or metadata_line is None:
+        return None
+    indent = None
+    for position in range(metadata_line + 1, len(lines)):
+        line = lines[position]
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        if not line[0].isspace():
+            break
+        if indent is None:
+            indent = line_indent(line)
+        if line_indent(line) != indent:
+            continue
+        match = METADATA_FIELD.match(line)
+        if match:
+            fields[match.group(2)] = (match.group(3), indent, position)
+    if 'name' not in fields:
+        return None
+    for field in ('apiVersion', 'kind', 'namespace', 'name'):
+        if field not in fields:
+            continue
+        value, field_indent, position = fields[field]
+        if value == '' or value.startswith(HEADER_UNSAFE_START):
+            return None
+        following = next_content_line(lines, position)
+        if following is not None and line_indent(following) > field_indent:
+            return None
+    try:
+        return (header_scalar(fields['apiVersion'][0]), header_scalar(fields['kind'][0]),
+                header_scalar(fields['namespace'][0]) if 'namespace' in fields else None,
+                header_scalar(fields['name'][0]))
+    except Exception:
+        return None
+
+
+def manifest_key(manifest):
+    """
+    Identity of a parsed manifest.
+    :return: tuple
+    """
+    metadata = manifest.get('metadata') or {}
+    return manifest.get('apiVersion'), manifest.get('kind'), metadata.get('namespace'), metadata.get('name')
+
+
+def is_blank_document(text):
+    return all(not line.strip() or line.lstrip().startswith('#') for line in text.split('\n'))
+
+
+class ManifestStore:
+    """
+    Rendered chart manifests indexed by (apiVersion, kind, namespace, name).
+    Documents are kept as text and only parsed the first time they are looked up.
+    """
+
+    def __init__(self):
+        self.resources = {}
+        self.documents = {}
+        self.kind_names = {}
+        self.containment_indexes = {}
+        self.parsing = 0.0
+
+    def __len__(self):
+        return sum(len(keys) for keys in self.kind_names.values())
+
+    def __getstate__(self):
+        # Containment indexes are keyed by object id, which does not survive pickling.
+        state = dict(self.__dict__)
+        state['containment_indexes'] = {}
+        return state
+
+    def keys(self):
+        return [key for keys in self.kind_names.values() for key in keys]
+
+    def index(self, key):
+        if key not in self.resources and key not in self.documents:
+            self.kind_names.setdefault((key[1], key[3]), []).append(key)
+
+    def add(self, manifest):
         """
-        Running test on chart templates.
+        Index a parsed manifest, a later document with the same identity replaces the previous one.
         """
-        self.render_chart()
-        msg = ''
-        for file_name, file_test in self.dic_tests.items():
-            print(f'---> Applying {file_name} file..\n')
-            time.sleep(1)
-            kind_type = parse('$.tests[0].type').find(file_test)
-            kind_name = parse('$.tests[0].name').find(file_test)
-            print(f'==> Running Tests on {Fore.BLUE} {kind_name[0].value} {kind_type[0].value} {Style.RESET_ALL}..\n')
+        key = manifest_key(manifest)
+        self.index(key)
+        self.documents.pop(key, None)
+        self.resources[key] = manifest
 
-            time.sleep(1)
-            test_scenario = parse('$..asserts[*]').find(file_test)
+    def add_document(self, text, only=None):
+        """
+        Index a raw manifest document without parsing it, documents not targeted by `only` are dropped.
+        """
+        if is_blank_document(text):
+            return
+        key = document_header(text)
+        manifest = None
+        if key is None:
+            manifest = parse_document(text)
+            if not isinstance(manifest, dict):
+                return
+            key = manifest_key(manifest)
+        self.index(key)
+        self.resources.pop(key, None)
+        self.documents.pop(key, None)
+        if only is not None and (key[1], key[3]) not in only:
+            self.documents[key] = None
+        elif manifest is not None:
+            self.resources[key] = manifest
+        else:
+            self.documents[key] = text
 
-            chart_to_test = ''
+    def resource(self, key):
+        """
+        Parsed manifest for an identity, parsing its document on first access.
+        Raise ValueError naming the resource when its document is not valid YAML.
+        :return: manifest or None
+        """
+        if key not in self.resources:
+            text = self.documents.get(key)
+            if text is None:
+                return None
+            started = time.perf_counter()
             try:
-                chart_to_test = self.mydict[kind_type[0].value][kind_name[0].value]
+                self.resources[key] = parse_document(text)
+            except Exception as err:
+                raise ValueError('{} {} is not valid YAML :: {}'.format(key[1], key[3], err)) from err
+            finally:
+                self.parsing += time.perf_counter() - started
+            del self.documents[key]
+        return self.resources[key]
 
-            except Exception:
-                print(f'{Fore.RED} X {Style.RESET_ALL} {kind_type[0].value} kind with name {kind_name[0].value}'
-                      f'does not exist in {self.chart} chart - Testing Failed ')
-                print('Found {} as names for kind {}  - Make sure you are using the right name!'.format(
-                    [key for key in self.mydict[kind_type[0].value]], kind_type[0].value))
-                continue
+    def parse(self, only):
+        """
+        Parse the documents targeted by `only`, a set of (kind, name), ahead of their lookups.
+        Documents that are not valid YAML are left for their lookup to report.
+        :return: number of documents parsed
+        """
+        parsed = 0
+        for key in self.keys():
+            if (key[1], key[3]) in only and self.documents.get(key) is not None:
+                try:
+                    self.resource(key)
+                except ValueError:
+                    continue
+                parsed += 1
+        return parsed
 
-            try:
-                test_ok = 0
-                test_ko = 0
-                for k in test_scenario:
-                    check_test_syntax = assert_pre_check(k, k.value['name'])
-                    if not check_test_syntax:
-                        continue
-                    for item in k.value['values']:
-                        find_spec = parse('$.' + item['path']).find(chart_to_test)
-                        if len(find_spec) == 0:
-                            print(f'{Fore.RED} X {Style.RESET_ALL} ERROR: Could not find expected {item["path"]}'
-                                  f'in {k.value["name"]} \n')
-                            test_ko += 1
-                            break
-                        if k.value['type'] == 'equal':
-                            if find_spec[0].value is not None and find_spec[0].value == item['value']:
-                                print('√ {} : {} PASS {} \n'.format(
-                                    k.value['name'], Fore.GREEN, Style.RESET_ALL))
-                                test_ok += 1
-                            else:
-                                print('{} X {} {} : {} FAILED {} \n'.format(
-                                    Fore.RED, Style.RESET_ALL, k.value['name'], Fore.RED, Style.RESET_ALL))
-                                test_ko += 1
-                        elif k.value['type'] == 'notEqual':
-                            if find_spec[0].value is not None and find_spec[0].value != item['value']:
-                                print('√ {} : {} PASS {} \n'.format(
-                                    k.value['name'], Fore.GREEN, Style.RESET_ALL))
-                                test_ok += 1
-                            else:
-                                print('{} X {} {} : {} FAILED {} \n'.format(
-                                    Fore.RED, Style.RESET_ALL, k.value['name'], Fore.RED, Style.RESET_ALL))
-                                test_ko += 1
-                        elif k.value['type'] == 'contains':
-                            type_item_value = type(item['value'])
-                            if type_item_value is str:
-                                self.content_array = [match.value for match in
-                                                      parse('$.' + item['path']).find(chart_to_test)]
-                                if item['value'] in self.content_array:
-                                    print('√ {} : {} PASS {} \n'.format(
-                                        k.value['name'], Fore.GREEN, Style.RESET_ALL))
-                                    test_ok += 1
-                                else:
-                                    print('{} X {} {} : {} FAILED {} \n'.format(
-                                        Fore.RED, Style.RESET_ALL, k.value['name'], Fore.RED, Style.RESET_ALL))
-                                    test_ko += 1
-                            else:
-                                dump_yaml = YamlDump()
-                                values_to_test = dump_yaml.dump(
-                                    parse('$.' + item['path']).find(chart_to_test)[0].value).split('\n')
-                                value_size = len(item['value'])
-                                for index in range(value_size):
-                                    if item['value'][index] in values_to_test:
-                                        print('√ {} {}: {} PASS {} \n'.format(
-                                            k.value['name'], item['value'][index], Fore.GREEN, Style.RESET_ALL))
-                                        test_ok += 1
-                                    else:
-                                        print('{} X {} {} {} : {} FAILED \n'.format(
-                                            Fore.RED, Style.RESET_ALL, k.value['name'], item['value'][index],
-                                            Fore.RED, Style.RESET_ALL))
-                                        test_ko += 1
-                        elif k.value['type'] == 'notContains':
-                            type_item_value = type(item['value'])
-                            if type_item_value is str:
-                                self.content_array = [match.value for match in
-                                                      parse('$.' + item['path']).find(chart_to_test)]
-                                if item['value'] not in self.content_array:
-                                    print('√ {} : {} PASS {} \n'.format(
-                                        k.value['name'], Fore.GREEN, Style.RESET_ALL))
-                                    test_ok += 1
-                                else:
-                                    print('{} X {} {} : {} FAILED {} \n'.format(
-                                        Fore.RED, Style.RESET_ALL, k.value['name'], Fore.RED, Style.RESET_ALL))
-                                    test_ko += 1
-                            else:
-                                dump_yaml = YamlDump()
-                                values_to_test = dump_yaml.dump(
-                                    parse('$.' + item['path']).find(chart_to_test)[0].value).split('\n')
-                                value_size = len(item['value'])
-                                for index in range(value_size):
-                                    if item['value'][index] not in values_to_test:
-                                        print('√ {} {}: {} PASS {} \n'.format(
-                                            k.value['name'], item['value'][index], Fore.GREEN, Style.RESET_ALL))
-                                        test_ok += 1
-                                    else:
-                                        print('{} X {} {} {} : {} FAILED \n'.format(
-                                            Fore.RED, Style.RESET_ALL, k.value['name'], item['value'][index],
-                                            Fore.RED, Style.RESET_ALL))
-                                        test_ko += 1
-                        elif k.value['type'] == 'isNotEmpty':
-                            if find_spec[0].value is not None and len(find_spec[0].value) > 0:
-                                print('√ {} : {} PASS {} \n'.format(
-                                    k.value['name'], Fore.GREEN, Style.RESET_ALL))
-                                test_ok += 1
-                            else:
-                                print('{} X {} {} : {} FAILED {} \n'.format(
-                                    Fore.RED, Style.RESET_ALL, k.value['name'], Fore.RED, Style.RESET_ALL))
-                                test_ko += 1
-                        elif k.value['type'] == 'isEmpty':
-                            if len(find_spec[0].value) == 0:
-                                print('√ {} : {} PASS {} \n'.format(
-                                    k.value['name'], Fore.GREEN, Style.RESET_ALL))
-                                test_ok += 1
-                            else:
-                                print('{} X {} {} : {} FAILED {} \n'.format(
-                                    Fore.RED, Style.RESET_ALL, k.value['name'], Fore.RED, Style.RESET_ALL))
-                                test_ko += 1
-                        elif k.value['type'] == 'matchValue':
-                            value_to_match = re.search(item['pattern'], find_spec[0].value)
-                            if value_to_match and value_to_match is not None:
-                                print('√ {} : {} PASS {} \n'.format(
-                                    k.value['name'], Fore.GREEN, Style.RESET_ALL))
-                                test_ok += 1
-                            else:
-                                print('{} X {} {} : {} FAILED {} \n'.format(
-                                    Fore.RED, Style.RESET_ALL, k.value['name'], Fore.RED, Style.RESET_ALL))
-                                test_ko += 1
-                        elif k.value['type'] == 'notMatchValue':
-                            value_to_match = re.search(item['pattern'], find_spec[0].value)
-                            if not value_to_match and value_to_match is None:
-                                print('√ {} : {} PASS {} \n'.format(
-                                    k.value['name'], Fore.GREEN, Style.RESET_ALL))
-                                test_ok += 1
-                            else:
-                                print('{} X {} {} : {} FAILED {} \n'.format(
-                                    Fore.RED, Style.RESET_ALL, k.value['name'], Fore.RED, Style.RESET_ALL))
-                                test_ko += 1
-                        else:
-                            print('{} X {} Unrecognized type {}  \n'.format(
-                                Fore.RED, Style.RESET_ALL, k.value['type']))
+    def retain(self, only):
+        """
+        Drop every document and manifest not targeted by `only`, a set of (kind, name).
+        """
+        for key in self.keys():
+            if (key[1], key[3]) not in only:
+                self.resources.pop(key, None)
+                self.documents[key] = None
 
-            except Exception as err:
-                print('{} X {}  Testing {}  :: {} failed'.format(
-                    Fore.RED, Style.RESET_ALL, self.chart, err))
+    def get(self, kind, name, namespace=None, api_version=None):
+        """
+        Find a manifest by kind and name, optionally narrowed by namespace and apiVersion.
+        :return: manifest or None
+        """
+        for key in self.kind_names.get((kind, name), []):
+            if (api_version is None or key[0] == api_version) and (namespace is None or key[2] == namespace):
+                manifest = self.resource(key)
+                if manifest is not None:
+                    return manifest
+        return None
 
-            if test_ok > 0 and test_ko == 0:
-                test_color = Fore.GREEN + file_name + Style.RESET_ALL
-            else:
-                test_color = Fore.RED + file_name + Style.RESET_ALL
+    def names(self, kind):
+        """
+        List rendered resource names for a kind.
+        :return: list
+        """
+        return [name for resource_kind, name in self.kind_names if resource_kind == kind]
 
-            msg += test_color + '\n' + 'Number of executed tests : ' + str(
-                test_ok + test_ko) + '\n' + 'Number of success tests : ' + str(
-                test_ok) + '\n' + 'Number of failed tests : ' + str(test_ko) + '\n\n'
-        print('{}==> Unit Tests Summary{} \n'.format(Fore.BLUE, Style.RESET_ALL))
-        print(msg)
+    def containment(self, node):
+        """
+        Containment index of a manifest subtree, built once and reused across assertions.
+        :return: ContainmentIndex
+        """
+        index = self.containment_indexes.get(id(node))
+        if index is None:
+            index = self.containment_indexes[id(node)] = ContainmentIndex(node, self.containment_indexes)
+        return index
+
+    def manifests(self):
+        """
+        Parse and list every indexed manifest in rendering order.
+        :return: list
+        """
+        return [manifest for manifest in (self.resource(key) for key in self.keys()) if manifest is not None]
+
+    def payload(self):
+        """
+        Compact form of the store, parsed manifests and still unparsed documents.
+        :return: dict
+        """
+        return {'manifests': list(self.resources.values()),
+                'documents': [(key, text) for key, text in self.documents.items() if text is not None]}
+
+    @classmethod
+    def from_payload(cls, payload, only=None):
+        """
+        Rebuild a store from its payload, keeping only resources targeted by `only`.
+        :return: ManifestStore
+        """
+        store = cls()
+        for manifest in payload['manifests']:
+            store.add(manifest)
+        for key, text in payload['documents']:
+            store.index(key)
+            store.documents[key] = text
+        if only is not None:
+            store.retain(only)
+        return store
+
+
+def ingest_manifests(store, lines, only=None):
+    """
+    Index documents from an iterable of lines as soon as each document marker is reached.
+    :return: seconds spent indexing
+    """
+    indexing = 0.0
+    document = []
+    for line in lines:
+        if DOCUMENT_SEPARATOR.fullmatch(line):
+            started = time.perf_counter()
+            store.add_document(''.join(document), only)
+            indexing += time.perf_counter() - started
+            document = []
+        else:
+            document.append(line)
+    started = time.perf_counter()
+    store.add_document(''.join(document), only)
+    return indexing + time.perf_counter() - started
+
+
+def load_manifests(output, only=None):
+    """
+    Split helm template output on document markers and index every document, parsing is deferred.
+    :return: ManifestStore
+    """
+    store = ManifestStore()
+    ingest_manifests(store, output.splitlines(True), only)
+    return store
+
+
+def cache_home():
+    """
+    Resolve the helm unit cache directory.
+    :return: str
+    """
+    if os.environ.get('HELM_UNIT_CACHE_DIR'):
+        return os.environ['HELM_UNIT_CACHE_DIR']
+    helm_cache = os.environ.get('HELM_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache', 'helm'))
+    return os.path.join(helm_cache, 'unit')
+
+
+HELMIGNORE_DEFAULTS = ['templates/.?*']
+
+
+def helmignore_rules(chart):
+    """
+    Rules of the chart .helmignore file, after the rules helm always applies.
+    :return: list of (pattern, negate, directory_only, full_path)
+    """
+    lines = list(HELMIGNORE_DEFAULTS)
+    try:
+        with open(os.path.join(chart, '.helmignore')) as stream:
+            lines += stream.read().splitlines()
+    except OSError:
+        pass
+    rules = []
+    for line in lines:
+        rule = line.strip()
+        if not rule or rule.startswith('#') or '**' in rule:
+            # helm rejects ** patterns, it does not apply them.
+            continue
+        negate = rule.startswith('!')
+        if negate:
+            rule = rule[1:]
+        directory_only = rule.endswith('/')
+        rule = rule.rstrip('/')
+        rules.append((rule.lstrip('/'), negate, directory_only, '/' in rule))
+    return rules
+
+
+def helm_ignored(rel_path, is_dir, rules):
+    """
+    Whether helm ignores a chart path, relative with / separators, evaluating rules the way helm does.
+    :return: bool
+    """
+    for pattern, negate, directory_only, full_path in rules:
+        target = rel_path if full_path else rel_path.rsplit('/', 1)[-1]
+        if negate:
+            if (directory_only and not is_dir) or not fnmatch.fnmatchcase(target, pattern):
+                return True
+            continue
+        if directory_only and not is_dir:
+            continue
+        if fnmatch.fnmatchcase(target, pattern):
+            return True
+    return False
+
+
+def chart_files(chart, exclude=()):
+    """
+    Files helm loads from the chart, in a stable order, skipping .helmignore matches and `exclude` directories.
+    :return: list
+    """
+    rules = helmignore_rules(chart)
+    excluded = {os.path.abspath(directory) for directory in exclude}
+    paths = []
+    for dir_path, dir_names, file_names in os.walk(chart):
+        dir_names[:] = sorted(
+            dir_name for dir_name in dir_names
+            if os.path.abspath(os.path.join(dir_path, dir_name)) not in excluded and
+            not helm_ignored(chart_path(chart, os.path.join(dir_path, dir_name)), True, rules))
+        paths += [os.path.join(dir_path, file_name) for file_name in sorted(file_names)
+                  if not helm_ignored(chart_path(chart, os.path.join(dir_path, file_name)), False, rules)]
+    return paths
+
+
+def chart_path(chart, path):
+    """
+    Path relative to the chart directory, with / separators as in .helmignore rules.
+    :return: str
+    """
+    return os.path.relpath(path, chart).replace(os.sep, '/')
+
+
+def is_chart_file(chart, path, exclude=()):
+    """
+    Whether a path, existing or deleted, is a file helm loads from the chart.
+    :return: bool
+    """
+    path = os.path.abspath(path)
+    if not path.startswith(os.path.abspath(chart) + os.sep):
+        return False
+    if any(path.startswith(os.path.abspath(directory) + os.sep) for directory in exclude):
+        return False
+    rules = helmignore_rules(chart)
+    parts = chart_path(chart, path).split('/')
+    return not any(helm_ignored('/'.join(parts[:depth]), depth < len(parts), rules)
+                   for depth in range(1, len(parts) + 1))
+
+
+def chart_digest(chart, exclude=()):
+    """
+    Hash the path and content of every file helm loads from the chart, see chart_files.
+    :return: str
+    """
+    digest = hashlib.sha256()
+    for file_path in chart_files(chart, exclude):
+        digest.update(chart_path(chart, file_path).encode('utf-8') + b'\0')
+        with open(file_path, 'rb') as stream:
+            digest.update(hashlib.sha256(stream.read()).digest())
+    return digest.hexdigest()
+
+
+def render_cache_key(chart_hash, flags, helm_binary, values_files=(), set_values=()):
+    """
+    Content address of a chart render: chart tree, values inputs, helm binary and flags.
+    :return: str
+    """
+    digest = hashlib.sha256()
+    digest.update('{}\0{}\0{}\0{}\0'.format(
+        RENDER_CACHE_FORMAT, chart_hash, helm_binary, ' '.join(flags)).encode('utf-8'))
+    for values_file in values_files:
+        digest.update(b'-f\0')
+        with open(values_file, 'rb') as stream:
+            digest.update(hashlib.sha256(stream.read()).digest())
+    for set_value in set_values:
+        digest.update(b'--set\0' + set_value.encode('utf-8') + b'\0')
+    return digest.hexdigest()
+
+
+def lint_cache_key(chart_hash, helm_binary):
+    """
+    Content address of a helm lint result: chart tree and helm binary.
+    :return: str
+    """
+    return hashlib.sha256('{}\0lint\0{}\0{}'.format(
+        RENDER_CACHE_FORMAT, chart_hash, helm_binary).encode('utf-8')).hexdigest()
+
+
+class RenderCache:
+    """
+    On-disk cache of lint results, parsed manifests, compiled test plans and schema indexes, evicting least
+    recently used entries by size.
+    """
+
+    ENTRY_SUFFIXES = ('.render', '.lint', '.tests', '.schemas')
+
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+
+    def entry_path(self, key, suffix='.render'):
+        return os.path.join(self.directory, key + suffix)
+
+    def read(self, path):
+        """
+        Read a cache entry and mark it as recently used.
+        :return: payload or None
+        """
+        try:
+            with open(path, 'rb') as stream:
+                payload = pickle.loads(zlib.decompress(stream.read()))
+            os.utime(path)
+            return payload
+        except Exception:
+            return None
+
+    def write(self, path, payload):
+        """
+        Write a cache entry, failures to write the cache never fail the run.
+        """
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+            with open(tmp_path, 'wb') as stream:
+                stream.write(zlib.compress(pickle.dumps(payload, pickle.HIGHEST_PROTOCOL)))
+            os.replace(tmp_path, path)
+            self.evict()
+        except (OSError, TypeError, pickle.PicklingError):
+            pass
+
+    def load(self, key, only=None):
+        """
+        Read a cached render, keeping only resources targeted by `only`.
+        :return: dict or None
+        """
+        payload = self.read(self.entry_path(key))
+        if payload is None:
+            return None
+        payload['manifests'] = ManifestStore.from_payload(payload['manifests'], only)
+        return payload
+
+    def save(self, key, store):
+        """
+        Store a render.
+        """
+        self.write(self.entry_path(key), {'manifests': store.payload()})
+
+    def load_lint(self, key):
+        """
+        Read a cached helm lint result.
+        :return: (returncode, output) or None
+        """
+        return self.read(self.entry_path(key, '.lint'))
+
+    def save_lint(self, key, lint_result):
+        self.write(self.entry_path(key, '.lint'), lint_result)
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits in max_size.
+        """
+        entries = []
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith(self.ENTRY_SUFFIXES):
+                try:
+                    stat = os.stat(os.path.join(self.directory, file_name))
+                except FileNotFoundError:
+                    # Evicted meanwhile by a concurrent run.
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, file_name))
+        total = sum(entry[1] for entry in entries)
+        for mtime, size, file_name in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.directory, file_name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+class TestPlanCache:
+    """
+    On-disk cache of the compiled plans of a tests directory. A file whose size and modification time are
+    unchanged reuses its plan without being read, a touched file is only recompiled if its content changed.
+    """
+
+    def __init__(self, cache, tests):
+        self.cache = cache
+        self.path = cache.entry_path(hashlib.sha256(os.path.abspath(tests).encode('utf-8')).hexdigest(), '.tests')
+        self.version = code_fingerprint()
+        self.entries = {}
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        payload = cache.read(self.path)
+        if isinstance(payload, dict) and payload.get('format') == TEST_CACHE_FORMAT and \
+                payload.get('version') == self.version:
+            self.entries = payload['entries']
+
+    def plan(self, file_name, compile_content):
+        """
+        Compiled plan of a test file, compile_content(text) is only called for new or changed files.
+        :return: dict
+        """
+        key = os.path.abspath(file_name)
+        stat = os.stat(file_name)
+        entry = self.entries.get(key)
+        if entry is not None and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+            self.hits += 1
+            return entry[3]
+        with open(file_name, 'rb') as stream:
+            content = stream.read()
+        digest = hashlib.sha256(content).hexdigest()
+        self.dirty = True
+        if entry is not None and entry[2] == digest:
+            self.hits += 1
+            self.entries[key] = (stat.st_size, stat.st_mtime_ns, digest, entry[3])
+            return entry[3]
+        self.misses += 1
+        test_plan = compile_content(str(content, 'utf-8'))
+        self.entries[key] = (stat.st_size, stat.st_mtime_ns, digest, test_plan)
+        return test_plan
+
+    def save(self, file_names):
+        """
+        Store the plans of file_names, forgetting removed files. Failures to write never fail the run.
+        """
+        keys = {os.path.abspath(file_name) for file_name in file_names}
+        if not self.dirty and keys == set(self.entries):
+            return
+        self.entries = {key: entry for key, entry in self.entries.items() if key in keys}
+        self.cache.write(self.path, {'format': TEST_CACHE_FORMAT, 'version': self.version, 'entries': self.entries})
+        self.dirty = False
+
+    def stats(self):
+        return 'hits: {}, misses: {}, files: {}'.format(self.hits, self.misses, len(self.entries))
+
+
+def code_fingerprint():
+    """
+    Identify this helm-unit build, compiled plans are only reused by the build that compiled them.
+    :return: str
+    """
+    try:
+        stat = os.stat(__file__)
+        return '{}:{}:{}'.format(os.path.realpath(__file__), stat.st_size, stat.st_mtime_ns)
+    except (NameError, OSError):
+        # Frozen builds have no source file, a rebuilt executable changes size or modification time.
+        try:
+            stat = os.stat(sys.executable)
+            executable = '{}:{}:{}'.format(os.path.realpath(sys.executable), stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            executable = sys.executable
+        return '{}:{}'.format(executable, ','.join(sorted(ASSERTIONS)))
+
+
+def render_manifests(chart, variant, only=None, flags=RENDER_FLAGS):
+    """
+    Render chart templates for one values variant, indexing documents while helm is still writing them.
+    :return: (returncode, ManifestStore or error output, indexing seconds)
+    """
+    command = ['helm', 'template', RELEASE_NAME, chart] + flags
+    for values_file in variant['values']:
+        command += ['-f', values_file]
+    for set_value in variant['set']:
+        command += ['--set', set_value]
+    release = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    errors = []
+    error_reader = threading.Thread(target=lambda: errors.append(release.stderr.read()), daemon=True)
+    error_reader.start()
+    store = ManifestStore()
+    indexing = ingest_manifests(store, io.TextIOWrapper(release.stdout, encoding='utf-8'), only)
+    release.wait()
+    error_reader.join()
+    if release.returncode != 0:
+        return release.returncode, errors[0] if errors else b'', indexing
+    return release.returncode, store, indexing
+
+
+def evaluate_test_file(file_name, test_plan, manifests, chart):
+    """
+    Run every test of a test file against one rendered variant, buffering its report. Timings hold the wall
+    time of the file, the time spent parsing manifests and [count, seconds] per assertion type.
+    :return: (report, test_ok, test_ko, timings), counts are None when none of the tested resources exist
+    """
+    report = io.StringIO()
+    started = time.perf_counter()
+    parsing_started = manifests.parsing
+    assertion_times = {}
+    print(f'---> Applying {file_name} file..\n', file=report)
+    test_ok, test_ko, missing = None, None, 0
+    for test in test_plan['tests']:
+        counts = evaluate_test(test, manifests, chart, report, assertion_times)
+        if counts is None:
+            missing += 1
+        else:
+            test_ok = (test_ok or 0) + counts[0]
+            test_ko = (test_ko or 0) + counts[1]
+    if test_ko is not None:
+        # A missing resource fails its test, unless no test of the file found its resource.
+        test_ko += missing
+    return report.getvalue(), test_ok, test_ko, {'seconds': time.perf_counter() - started,
+                                                 'parsing': manifests.parsing - parsing_started,
+                                                 'assertions': assertion_times}
+
+
+def evaluate_test(test, manifests, chart, report, assertion_times):
+    """
+    Run the assertions of one test entry, writing to report.
+    :return: (test_ok, test_ko) or None when the tested resource is missing
+    """
+    kind_type = test['type']
+    kind_name = test['name']
+    print(f'==> Running Tests on {Fore.BLUE} {kind_name} {kind_type} {Style.RESET_ALL}..\n', file=report)
+
+    try:
+        chart_to_test = manifests.get(kind_type, kind_name, test['namespace'], test['apiVersion'])
+    except ValueError as err:
+        print('{} X {} rendering {} chart templates failed :: {}'.format(
+            Fore.RED, Style.RESET_ALL, chart, err), file=report)
+        return 0, 1
+    if chart_to_test is None:
+        print(f'{Fore.RED} X {Style.RESET_ALL} {kind_type} kind with name {kind_name}'
+              f'does not exist in {chart} chart - Testing Failed ', file=report)
+        print('Found {} as names for kind {}  - Make sure you are using the right name!'.format(
+            manifests.names(kind_type), kind_type), file=report)
+        return None
+
+    test_ok = 0
+    test_ko = 0
+    try:
+        for assertion in test['asserts']:
+            assert_started = time.perf_counter()
+            try:
+                if assertion.error is not None:
+                    print(assertion.error, end='', file=report)
+                    continue
+                for path, compiled_path, arg in assertion.values:
+                    if isinstance(compiled_path, Exception):
+                        print('{} X {} {} : invalid path {} :: {} \n'.format(
+                            Fore.RED, Style.RESET_ALL, assertion.name, path, compiled_path), file=report)
+                        test_ko += 1
+                        break
+                    find_spec = compiled_path.find(chart_to_test)
+                    if len(find_spec) == 0:
+                        print(f'{Fore.RED} X {Style.RESET_ALL} ERROR: Could not find expected {path}'
+                              f'in {assertion.name} \n', file=report)
+                        test_ko += 1
+                        break
+                    if assertion.type_name not in ASSERTIONS:
+                        print('{} X {} Unrecognized type {}  \n'.format(
+                            Fore.RED, Style.RESET_ALL, assertion.type_name), file=report)
+                        continue
+                    if isinstance(arg, Exception):
+                        # Values rejected when the test file was compiled only fail their own assertion.
+                        print('{} X {} {} : invalid value :: {} \n'.format(
+                            Fore.RED, Style.RESET_ALL, assertion.name, arg), file=report)
+                        test_ko += 1
+                        break
+                    for detail, passed in ASSERTIONS[assertion.type_name].check(find_spec, arg, manifests):
+                        if passed and detail is None:
+                            print('√ {} : {} PASS {} \n'.format(
+                                assertion.name, Fore.GREEN, Style.RESET_ALL), file=report)
+                        elif passed:
+                            print('√ {} {}: {} PASS {} \n'.format(
+                                assertion.name, detail, Fore.GREEN, Style.RESET_ALL), file=report)
+                        elif detail is None:
+                            print('{} X {} {} : {} FAILED {} \n'.format(
+                                Fore.RED, Style.RESET_ALL, assertion.name, Fore.RED, Style.RESET_ALL), file=report)
+                        else:
+                            print('{} X {} {} {} : {} FAILED \n'.format(
+                                Fore.RED, Style.RESET_ALL, assertion.name, detail, Fore.RED), file=report)
+                        if passed:
+                            test_ok += 1
+                        else:
+                            test_ko += 1
+            finally:
+                if assertion.type_name is not None:
+                    record_timing(assertion_times, assertion.type_name, time.perf_counter() - assert_started)
+
+    except Exception as err:
+        print('{} X {}  Testing {}  :: {} failed'.format(
+            Fore.RED, Style.RESET_ALL, chart, err), file=report)
+    return test_ok, test_ko
+
+
+def record_timing(timings, name, seconds):
+    """
+    Accumulate a [count, seconds] timing entry.
+    """
+    entry = timings.setdefault(str(name), [0, 0.0])
+    entry[0] += 1
+    entry[1] += seconds
+
+
+class Profiler:
+    """
+    Collect wall time per phase, per test file and per assertion type.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.files = {}
+        self.assertions = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Time a block of work, repeated phases are accumulated.
+        """
+        phase_started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - phase_started)
+
+    def add_phase(self, name, seconds):
+        """
+        Accumulate time measured elsewhere, e.g. in a render thread.
+        """
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def add_file(self, file_name, timings):
+        """
+        Record the timings returned by a test worker. Manifests not parsed ahead are parsed on first lookup
+        inside the workers, that parsing time is added to the manifest parsing phase, summed over workers.
+        """
+        self.files[file_name] = timings['seconds']
+        self.add_phase('manifest parsing', timings['parsing'])
+        for assert_type, (count, seconds) in timings['assertions'].items():
+            entry = self.assertions.setdefault(assert_type, [0, 0.0])
+            entry[0] += count
+            entry[1] += seconds
+
+    def to_dict(self):
+        """
+        Machine readable profile.
+        :return: dict
+        """
+        return {
+            'total': time.perf_counter() - self.started,
+            'phases': self.phases,
+            'files': self.files,
+            'assertions': {assert_type: {'count': count, 'seconds': seconds}
+                           for assert_type, (count, seconds) in self.assertions.items()}
+        }
+
+    def print_report(self):
+        """
+        Print the profile as a table.
+        """
+        profile = self.to_dict()
+        print('{}==> Profile{} \n'.format(Fore.BLUE, Style.RESET_ALL))
+        for phase, seconds in profile['phases'].items():
+            print('{:<40} {:>10.4f}s'.format(phase, seconds))
+        print('{:<40} {:>10.4f}s\n'.format('total', profile['total']))
+        for file_name, seconds in profile['files'].items():
+            print('{:<40} {:>10.4f}s'.format(file_name, seconds))
+        print()
+        for assert_type, entry in profile['assertions'].items():
+            print('{:<28} {:>6} x {:>10.4f}s'.format(assert_type, entry['count'], entry['seconds']))
+        print()
+
+
+def worker_pool(workers, initializer=None, initargs=(), thread_safe=True):
+    """
+    Pool of evaluation workers. Workers are forked wherever the platform can fork, frozen builds included,
+    since spawned workers would re-execute the frozen binary. Frozen builds that cannot fork use threads,
+    a single one when the work is not thread safe.
+    :return: concurrent.futures.Executor
+    """
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context('fork'),
+            initializer=initializer, initargs=initargs)
+    if getattr(sys, 'frozen', False):
+        return concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers if thread_safe else 1, initializer=initializer, initargs=initargs)
+    return concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs)
+
+
+test_worker_state = {}
+
+
+def init_test_worker(dic_tests, manifests, chart):
+    """
+    Share the loaded test plans and rendered manifests with a test worker.
+    """
+    test_worker_state.update(dic_tests=dic_tests, manifests=manifests, chart=chart)
+
+
+def run_label(file_name, variant_name):
+    """
+    Name of a (test file, variant) pair in reports.
+    :return: str
+    """
+    return file_name if variant_name == DEFAULT_VARIANT['name'] else '{} [{}]'.format(file_name, variant_name)
+
+
+def run_test_worker(file_name, variant_name):
+    """
+    Evaluate a (test file, variant) pair inside a test worker.
+    :return: (report, test_ok, test_ko, timings), see evaluate_test_file
+    """
+    return evaluate_test_file(run_label(file_name, variant_name), test_worker_state['dic_tests'][file_name],
+                              test_worker_state['manifests'][variant_name], test_worker_state['chart'])
+
+
+def schema_key(api_version, kind, short=False):
+    """
+    Schema index key of an apiVersion/kind, short keys only keep the first segment of the group.
+    :return: str
+    """
+    group, _, version = str(api_version).rpartition('/')
+    if short:
+        group = group.split('.')[0]
+    return '{}/{}/{}'.format(group, version, str(kind).lower())
+
+
+def schema_file_keys(relative_path, schema):
+    """
+    Identify which apiVersion/kind a schema file describes, from x-kubernetes-group-version-kind,
+    a CRD catalog layout (group/kind_version.json) or a kubernetes-json-schema file name (kind-group-version.json).
+    :return: list
+    """
+    keys = []
+    for gvk in schema.get('x-kubernetes-group-version-kind') or []:
+        api_version = '{}/{}'.format(gvk['group'], gvk['version']) if gvk.get('group') else gvk['version']
+        keys.append(schema_key(api_version, gvk['kind']))
+    if keys:
+        return keys
+    directory, file_name = os.path.split(relative_path)
+    name = file_name[:-len('.json')]
+    if '_' in name and directory:
+        kind, _, version = name.rpartition('_')
+        return [schema_key('{}/{}'.format(os.path.basename(directory), version), kind)]
+    parts = name.split('-')
+    if len(parts) == 2 and parts[1].startswith('v'):
+        return [schema_key(parts[1], parts[0])]
+    if len(parts) == 3 and parts[2].startswith('v'):
+        return [schema_key('{}/{}'.format(parts[1], parts[2]), parts[0], short=True)]
+    return []
+
+
+def resolve_pointer(document, fragment):
+    node = document
+    for part in fragment.lstrip('/').split('/'):
+        if part:
+            part = part.replace('~1', '/').replace('~0', '~')
+            node = node[int(part)] if isinstance(node, list) else node[part]
+    return node
+
+
+def schema_index(directory, cache=None):
+    """
+    Build, or reuse from the render cache when one is given, the index of every schema in directory with
+    $refs resolved into one definitions table, so validators can be compiled without reading schema files again.
+    :return: dict
+    """
+    files = []
+    for dir_path, dir_names, file_names in os.walk(directory):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            if file_name.endswith('.json'):
+                path = os.path.join(dir_path, file_name)
+                stat = os.stat(path)
+                files.append((os.path.relpath(path, directory), stat.st_size, stat.st_mtime_ns))
+    digest = hashlib.sha256('{}\0{}\0{}'.format(
+        SCHEMA_INDEX_FORMAT, os.path.abspath(directory), files).encode('utf-8')).hexdigest()
+    if cache is not None:
+        index = cache.read(cache.entry_path(digest, '.schemas'))
+        if index is not None:
+            return index
+
+    documents = {}
+
+    def document(relative_path):
+        if relative_path not in documents:
+            with open(os.path.join(directory, relative_path), 'r') as stream:
+                documents[relative_path] = json.load(stream)
+        return documents[relative_path]
+
+    definitions = {}
+
+    def rewrite(node, relative_path):
+        if isinstance(node, list):
+            return [rewrite(item, relative_path) for item in node]
+        if not isinstance(node, dict):
+            return node
+        if isinstance(node.get('$ref'), str):
+            target_file, _, fragment = node['$ref'].partition('#')
+            target_file = os.path.normpath(os.path.join(os.path.dirname(relative_path), target_file)) \
+                if target_file else relative_path
+            name = '{}#{}'.format(target_file, fragment)
+            if name not in definitions:
+                try:
+                    target = resolve_pointer(document(target_file), fragment)
+                except (OSError, ValueError, LookupError, TypeError) as err:
+                    raise ValueError('{}: cannot resolve $ref {} ({}: {})'.format(
+                        relative_path, node['$ref'], type(err).__name__, err)) from err
+                definitions[name] = None
+                definitions[name] = rewrite(target, target_file)
+            return {'$ref': name}
+        return {key: rewrite(item, relative_path) for key, item in node.items()}
+
+    kinds = {}
+    for relative_path, size, mtime in files:
+        try:
+            schema = document(relative_path)
+        except ValueError:
+            continue
+        if not isinstance(schema, dict):
+            continue
+        for key in schema_file_keys(relative_path, schema):
+            kinds.setdefault(key, rewrite(schema, relative_path))
+    index = {'kinds': kinds, 'definitions': definitions}
+    if cache is not None:
+        cache.write(cache.entry_path(digest, '.schemas'), index)
+    return index
+
+
+JSON_TYPES = {
+    'object': lambda value: isinstance(value, dict),
+    'array': lambda value: isinstance(value, list),
+    'string': lambda value: isinstance(value, (str, datetime, date)),
+    'integer': lambda value: isinstance(value, int) and not isinstance(value, bool),
+    'number': lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    'boolean': lambda value: isinstance(value, bool),
+    'null': lambda value: value is None,
+}
+
+
+SCHEMA_KEYWORDS = {
+    'type', 'enum', 'const', 'not', 'required', 'properties', 'patternProperties', 'additionalProperties',
+    'items', 'allOf', 'anyOf', 'oneOf', 'pattern', 'format', 'minimum', 'maximum', 'exclusiveMinimum',
+    'exclusiveMaximum', 'multipleOf', 'minLength', 'maxLength', 'minItems', 'maxItems', 'uniqueItems',
+    'minProperties', 'maxProperties',
+}
+
+SCHEMA_ANNOTATIONS = {
+    '$schema', '$id', 'id', '$comment', 'title', 'description', 'default', 'example', 'examples',
+    'definitions', '$defs', 'readOnly', 'writeOnly', 'deprecated', 'externalDocs', 'nullable',
+}
+
+DATE_TIME = re.compile(r'^\d{4}-\d{2}-\d{2}[Tt ]\d{2}:\d{2}:\d{2}(\.\d+)?([Zz]|[+-]\d{2}:\d{2})$')
+
+SCHEMA_FORMATS = {
+    'int-or-string': lambda value: True,
+    'int32': lambda value: not JSON_TYPES['integer'](value) or -2 ** 31 <= value < 2 ** 31,
+    'int64': lambda value: not JSON_TYPES['integer'](value) or -2 ** 63 <= value < 2 ** 63,
+    'float': lambda value: True,
+    'double': lambda value: True,
+    'byte': lambda value: not isinstance(value, str) or re.match(r'^[A-Za-z0-9+/]*={0,2}$', value) is not None,
+    'date': lambda value: not isinstance(value, str) or re.match(r'^\d{4}-\d{2}-\d{2}$', value) is not None,
+    'date-time': lambda value: not isinstance(value, str) or DATE_TIME.match(value) is not None,
+}
+
+
+def is_json_number(value):
+    return JSON_TYPES['number'](value)
+
+
+class SchemaValidators:
+    """
+    Validators compiled from a schema index, each schema and definition is compiled once per process.
+    """
+
+    def __init__(self, index):
+        self.kinds = index['kinds']
+        self.definitions = index['definitions']
+        self.compiled = {}
+        self.unsupported = set()
+
+    def validator(self, api_version, kind):
+        """
+        Compiled validator of an apiVersion/kind.
+        :return: callable(value, path, errors) or None
+        """
+        for key in (schema_key(api_version, kind), schema_key(api_version, kind, short=True)):
+            if key in self.kinds:
+                if key not in self.compiled:
+                    self.compiled[key] = self.compile(self.kinds[key])
+                return self.compiled[key]
+        return None
+
+    def reference(self, name):
+        def check(value, path, errors):
+            if name not in self.compiled:
+                self.compiled[name] = self.compile(self.definitions[name])
+            self.compiled[name](value, path, errors)
+        return check
+
+    def compile(self, schema):
+        """
+        Compile a schema into a closure appending 'path: message' strings to errors. Keywords that
+        are not checked are collected in self.unsupported rather than silently ignored.
+        :return: callable
+        """
+        if not isinstance(schema, dict):
+            return lambda value, path, errors: None
+        if '$ref' in schema:
+            return self.reference(schema['$ref'])
+        self.unsupported.update(keyword for keyword in schema if keyword not in SCHEMA_KEYWORDS and
+                                keyword not in SCHEMA_ANNOTATIONS and not keyword.startswith('x-'))
+        checks = []
+        types = schema.get('type')
+        if schema.get('x-kubernetes-int-or-string') or schema.get('format') == 'int-or-string':
+            types = ['integer', 'string']
+        if types:
+            types = [types] if isinstance(types, str) else list(types)
+            if schema.get('nullable'):
+                types.append('null')
+            type_checks = [JSON_TYPES[name] for name in types if name in JSON_TYPES]
+
+            def check_type(value, path, errors):
+                if not any(type_check(value) for type_check in type_checks):
+                    errors.append('{}: expected {}, got {}'.format(path or '.', ' or '.join(types), type(value).__name__))
+                    return False
+                return True
+            checks.append(check_type)
+        if 'enum' in schema:
+            allowed = schema['enum']
+            checks.append(lambda value, path, errors: value in allowed or errors.append(
+                '{}: {!r} is not one of {}'.format(path or '.', value, allowed)))
+        if 'const' in schema:
+            expected = schema['const']
+            checks.append(lambda value, path, errors: value == expected or errors.append(
+                '{}: {!r} is not {!r}'.format(path or '.', value, expected)))
+        if 'not' in schema:
+            negated = self.compile(schema['not'])
+
+            def check_not(value, path, errors):
+                negated_errors = []
+                negated(value, path, negated_errors)
+                if not negated_errors:
+                    errors.append('{}: must not match the schema'.format(path or '.'))
+            checks.append(check_not)
+        checks += self.compile_bounds(schema)
+        required = schema.get('required') or []
+        properties = {key: self.compile(item) for key, item in (schema.get('properties') or {}).items()}
+        patterns = [(re.compile(pattern), self.compile(item))
+                    for pattern, item in (schema.get('patternProperties') or {}).items()]
+        additional = schema.get('additionalProperties')
+        preserve_unknown = schema.get('x-kubernetes-preserve-unknown-fields', False)
+        additional_check = self.compile(additional) if isinstance(additional, dict) else None
+        if required or properties or patterns or additional is False or additional_check:
+            def check_object(value, path, errors):
+                if not isinstance(value, dict):
+                    return
+                for key in required:
+                    if key not in value:
+                        errors.append('{}: missing required field {}'.format(path or '.', key))
+                for key, item in value.items():
+                    item_path = '{}.{}'.format(path, key) if path else str(key)
+                    matched = key in properties
+                    if matched:
+                        properties[key](item, item_path, errors)
+                    for regex, pattern_check in patterns:
+                        if regex.search(str(key)):
+                            matched = True
+                            pattern_check(item, item_path, errors)
+                    if matched:
+                        continue
+                    if additional_check is not None:
+                        additional_check(item, item_path, errors)
+                    elif additional is False and not preserve_unknown:
+                        errors.append('{}: unknown field'.format(item_path))
+            checks.append(check_object)
+        if 'items' in schema:
+            items_check = self.compile(schema['items'])
+
+            def check_array(value, path, errors):
+                if isinstance(value, list):
+                    for position, item in enumerate(value):
+                        items_check(item, '{}[{}]'.format(path, position), errors)
+            checks.append(check_array)
+        for combinator in ('allOf', 'anyOf', 'oneOf'):
+            if combinator in schema:
+                branches = [self.compile(item) for item in schema[combinator]]
+                checks.append(self.combine(combinator, branches))
+
+        def check_schema(value, path, errors):
+            for check in checks:
+                if check(value, path, errors) is False:
+                    return
+        return check_schema
+
+    def compile_bounds(self, schema):
+        """
+        Compile the string, number, array and object size constraints and the format of a schema.
+        :return: list of callable(value, path, errors)
+        """
+        checks = []
+        if 'pattern' in schema:
+            regex = re.compile(schema['pattern'])
+            checks.append(lambda value, path, errors: not isinstance(value, str) or regex.search(value) or errors.append(
+                '{}: {!r} does not match {}'.format(path or '.', value, schema['pattern'])))
+        schema_format = schema.get('format')
+        if schema_format in SCHEMA_FORMATS:
+            format_check = SCHEMA_FORMATS[schema_format]
+            checks.append(lambda value, path, errors: format_check(value) or errors.append(
+                '{}: {!r} is not a valid {}'.format(path or '.', value, schema_format)))
+        elif schema_format is not None:
+            self.unsupported.add('format: {}'.format(schema_format))
+        minimum, maximum = schema.get('minimum'), schema.get('maximum')
+        exclusive_minimum, exclusive_maximum = schema.get('exclusiveMinimum'), schema.get('exclusiveMaximum')
+        if exclusive_minimum is True:
+            minimum, exclusive_minimum = None, minimum
+        if exclusive_maximum is True:
+            maximum, exclusive_maximum = None, maximum
+        for bound, applies, message in (
+                (minimum, lambda value, bound: value >= bound, 'is less than'),
+                (maximum, lambda value, bound: value <= bound, 'is greater than'),
+                (exclusive_minimum, lambda value, bound: value > bound, 'is less than or equal to'),
+                (exclusive_maximum, lambda value, bound: value < bound, 'is greater than or equal to'),
+                (schema.get('multipleOf'), lambda value, bound: abs(value / bound - round(value / bound)) < 1e-9,
+                 'is not a multiple of')):
+            if is_json_number(bound):
+                checks.append(self.bound(JSON_TYPES['number'], lambda value: value, bound, applies, message))
+        for keyword, accepts, applies, message in (
+                ('minLength', JSON_TYPES['string'], lambda size, bound: size >= bound, 'is shorter than'),
+                ('maxLength', JSON_TYPES['string'], lambda size, bound: size <= bound, 'is longer than'),
+                ('minItems', JSON_TYPES['array'], lambda size, bound: size >= bound, 'has fewer items than'),
+                ('maxItems', JSON_TYPES['array'], lambda size, bound: size <= bound, 'has more items than'),
+                ('minProperties', JSON_TYPES['object'], lambda size, bound: size >= bound, 'has fewer properties than'),
+                ('maxProperties', JSON_TYPES['object'], lambda size, bound: size <= bound, 'has more properties than')):
+            if is_json_number(schema.get(keyword)):
+                checks.append(self.bound(accepts, len, schema[keyword], applies, message))
+        if schema.get('uniqueItems'):
+            checks.append(lambda value, path, errors: not isinstance(value, list) or
+                          len({json.dumps(item, sort_keys=True, default=str) for item in value}) == len(value) or
+                          errors.append('{}: items are not unique'.format(path or '.')))
+        return checks
+
+    @staticmethod
+    def bound(accepts, measure, bound, applies, message):
+        def check(value, path, errors):
+            if accepts(value) and not applies(measure(value), bound):
+                errors.append('{}: {!r} {} {}'.format(path or '.', value, message, bound))
+        return check
+
+    @staticmethod
+    def combine(combinator, branches):
+        def check(value, path, errors):
+            results = []
+            for branch in branches:
+                branch_errors = []
+                branch(value, path, branch_errors)
+                results.append(branch_errors)
+            passed = sum(1 for branch_errors in results if not branch_errors)
+            if combinator == 'allOf':
+                for branch_errors in results:
+                    errors.extend(branch_errors)
+            elif combinator == 'anyOf' and passed == 0:
+                errors.append('{}: does not match any allowed schema'.format(path or '.'))
+            elif combinator == 'oneOf' and passed != 1:
+                errors.append('{}: must match exactly one schema, matched {}'.format(path or '.', passed))
+        return check
+
+
+schema_worker_state = {}
+
+
+def init_schema_worker(index):
+    """
+    Receive the schema index once per validation worker.
+    """
+    schema_worker_state['validators'] = SchemaValidators(index)
+
+
+def validate_chunk(documents):
+    """
+    Validate (label, manifest) pairs inside a validation worker.
+    :return: (list of (label, errors, has_schema), schema keywords the worker could not check)
+    """
+    validators = schema_worker_state['validators']
+    results = []
+    for label, manifest in documents:
+        validator = validators.validator(manifest.get('apiVersion'), manifest.get('kind'))
+        errors = []
+        if validator is not None:
+            validator(manifest, '', errors)
+        results.append((label, errors, validator is not None))
+    return results, set(validators.unsupported)
+
+
+def validate_documents(index, documents, jobs=1, chunk_size=64):
+    """
+    Validate (label, manifest) pairs against the schema index, in parallel when jobs > 1.
+    :return: (list of (label, errors) failures, number of manifests without schema, sorted unchecked keywords)
+    """
+    chunks = [documents[start:start + chunk_size] for start in range(0, len(documents), chunk_size)]
+    workers = min(jobs, len(chunks))
+    if workers > 1:
+        with worker_pool(workers, init_schema_worker, (index,)) as pool:
+            chunk_results = list(pool.map(validate_chunk, chunks))
+    else:
+        init_schema_worker(index)
+        chunk_results = [validate_chunk(chunk) for chunk in chunks]
+    results = [result for chunk, unsupported in chunk_results for result in chunk]
+    unsupported = set().union(*[unsupported for chunk, unsupported in chunk_results])
+    failures = [(label, errors) for label, errors, has_schema in results if errors]
+    return failures, sum(1 for label, errors, has_schema in results if not has_schema), sorted(unsupported)
+
+
+class Testing(Linting):
+    def __init__(self, args_cli=None, helm_version=None):
+        super().__init__(args_cli, helm_version)
+
+    def render_chart(self):
+        """
+        Render chart templates locally, the renders run while helm lint is reported.
+        """
+        self.initialize_unit()
+        self.manifests = {}
+        self.render_keys = {}
+        pending = self.submit_renders(self.variants.values())
+        self.check_chart_syntax()
+        self.collect_renders(pending)
+        if self.args_cli.schemas:
+            self.validate_variants(self.variants)
+
+    def validate_variants(self, variant_names):
+        """
+        Validate rendered manifests against the offline schema index.
+        """
+        # Renders are collected, stop the helm threads before validation workers are forked.
+        self.stop_helm()
+        try:
+            with self.profiler.phase('schema validation'):
+                index = schema_index(self.args_cli.schemas, self.render_cache)
+                documents = []
+                for variant_name in variant_names:
+                    store = self.manifests[variant_name]
+                    for key in store.keys():
+                        manifest = store.resource(key)
+                        if manifest is not None:
+                            documents.append((run_label('{}/{}'.format(key[1], key[3]), variant_name), manifest))
+                failures, unknown, unsupported = validate_documents(index, documents, self.args_cli.jobs)
+        except Exception as err:
+            print('{} X {} Offline validation of {} chart failed :: {}'.format(
+                Fore.RED, Style.RESET_ALL, self.chart, err))
+            sys.exit(1)
+        if unsupported:
+            print('{} ! {} Schema keywords not checked offline: {}\n'.format(
+                Fore.YELLOW, Style.RESET_ALL, ', '.join(unsupported)))
+        if failures:
+            for label, errors in failures:
+                for error in errors:
+                    print('{} X {} {}: {}'.format(Fore.RED, Style.RESET_ALL, label, error))
+            print('\n{} X {} Offline validation failed for {} manifest(s) \n'.format(
+                Fore.RED, Style.RESET_ALL, len(failures)))
+            sys.exit(1)
+        print('√ Validating {} manifest(s) offline : {} PASS {} ({} without schema)\n'.format(
+            len(documents), Fore.GREEN, Style.RESET_ALL, unknown))
+
+    def render_variants(self, variants):
+        """
+        Render values variants, reusing the cache.
+        """
+        self.collect_renders(self.submit_renders(variants))
+
+    def submit_renders(self, variants):
+        """
+        Load cached renders and start helm template, at most --jobs at a time, for the other variants.
+        :return: list of (variant, render_key, future) pending renders
+        """
+        only = self.tested_resources() if self.args_cli.only_tested else None
+        pending = []
+        try:
+            for variant in variants:
+                cached_render, render_key = None, None
+                if self.render_cache is not None:
+                    render_key = render_cache_key(self.chart_hash, self.render_flags, self.helm_binary,
+                                                  variant['values'], variant['set'])
+                    with self.profiler.phase('render cache'):
+                        cached_render = self.render_cache.load(render_key, only)
+                self.render_keys[variant['name']] = render_key
+                if cached_render is not None:
+                    self.manifests[variant['name']] = cached_render['manifests']
+                else:
+                    self.start_pools()
+                    pending.append((variant, render_key, self.render_pool.submit(
+                        render_manifests, self.chart, variant, only if self.render_cache is None else None,
+                        self.render_flags)))
+        except Exception as err:
+            print('{} X {} rendering {} chart templates failed :: {}'.format(
+                Fore.RED, Style.RESET_ALL, self.chart, err))
+            sys.exit(1)
+        return pending
+
+    def collect_renders(self, pending):
+        """
+        Wait for the renders started by submit_renders and cache their manifests.
+        """
+        only = self.tested_resources() if self.args_cli.only_tested else None
+        try:
+            for variant, render_key, future in pending:
+                with self.profiler.phase('helm template'):
+                    returncode, out_rel, indexing = future.result()
+                self.profiler.add_phase('manifest indexing', indexing)
+                if returncode == 0:
+                    self.manifests[variant['name']] = out_rel
+                    if self.render_cache is not None:
+                        # Cached entries hold the tested manifests parsed, warm runs skip their parsing.
+                        self.parse_manifests(out_rel)
+                        with self.profiler.phase('render cache'):
+                            self.render_cache.save(render_key, self.manifests[variant['name']])
+                    if only is not None:
+                        self.manifests[variant['name']].retain(only)
+                else:
+                    print(' {} X {} {} '.format(
+                        Fore.RED, Style.RESET_ALL, str(out_rel, 'utf-8')))
+                    sys.exit(1)
+
+        except Exception as err:
+            print('{} X {} rendering {} chart templates failed :: {}'.format(
+                Fore.RED, Style.RESET_ALL, self.chart, err))
+            sys.exit(1)
+
+    def parse_manifests(self, store):
+        """
+        Parse the documents targeted by the loaded tests, timed as the manifest parsing phase.
+        :return: number of documents parsed
+        """
+        parsing = store.parsing
+        parsed = store.parse(self.tested_resources())
+        self.profiler.add_phase('manifest parsing', store.parsing - parsing)
+        return parsed
+
+    def save_parsed_renders(self, variant_names):
+        """
+        Write back cached renders whose tested documents were parsed during this run.
+        """
+        if self.render_cache is None or self.args_cli.only_tested:
+            # Stores narrowed by --only-tested no longer hold every document of the render.
+            return
+        with self.profiler.phase('render cache'):
+            for variant_name in variant_names:
+                self.render_cache.save(self.render_keys[variant_name], self.manifests[variant_name])
+
+    def evaluate_runs(self, runs):
+        """
+        Evaluate (test file, variant) pairs on the worker pool and print their reports in order.
+        """
+        file_names = [file_name for file_name, variant_name, test_plan in runs]
+        variant_names = [variant_name for file_name, variant_name, test_plan in runs]
+        parsed_variants = [variant_name for variant_name in dict.fromkeys(variant_names)
+                           if self.parse_manifests(self.manifests[variant_name])]
+        evaluation_started = time.perf_counter()
+        workers = min(self.args_cli.jobs, len(runs))
+        initargs = (self.dic_tests, self.manifests, self.chart)
+        if workers > 1:
+            # Forked workers must not inherit running helm threads, the pools are started again on demand.
+            self.stop_helm()
+            pool = worker_pool(workers, init_test_worker, initargs)
+            results = pool.map(run_test_worker, file_names, variant_names)
+        else:
+            pool = None
+            init_test_worker(*initargs)
+            results = map(run_test_worker, file_names, variant_names)
+        try:
+            for file_name, variant_name, (report, test_ok, test_ko, timings) in zip(file_names, variant_names, results):
+                print(report, end='', flush=True)
+                self.profiler.add_file(run_label(file_name, variant_name), timings)
+                self.results[(file_name, variant_name)] = (report, test_ok, test_ko)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        self.profiler.add_phase('assertion evaluation', time.perf_counter() - evaluation_started)
+        self.save_parsed_renders(parsed_variants)
+
+    def print_summary(self):
+        """
+        Print the number of executed, successful and failed tests per test file.
+        """
+        msg = ''
+        for file_name, variant_name, test_plan in self.test_runs():
+            report, test_ok, test_ko = self.results[(file_name, variant_name)]
+            if test_ok is None:
+                continue
+            file_name = run_label(file_name, variant_name)
+            if test_ok > 0 and test_ko == 0:
+                test_color = Fore.GREEN + file_name + Style.RESET_ALL
+            else:
+                test_color = Fore.RED + file_name + Style.RESET_ALL
+
+            msg += test_color + '\n' + 'Number of executed tests : ' + str(
+                test_ok + test_ko) + '\n' + 'Number of success tests : ' + str(
+                test_ok) + '\n' + 'Number of failed tests : ' + str(test_ko) + '\n\n'
+        print('{}==> Unit Tests Summary{} \n'.format(Fore.BLUE, Style.RESET_ALL))
+        print(msg)
+
+    def run_test(self):
+        """
+        Running test on chart templates.
+        """
+        self.render_chart()
+        self.results = {}
+        self.evaluate_runs(self.test_runs())
+        self.print_summary()
+        if self.args_cli.cache_stats:
+            print('==> JSONPath cache :: {}\n'.format(path_cache_stats()))
+            if self.test_cache is not None:
+                print('==> Test plan cache :: {}\n'.format(self.test_cache.stats()))
+        if self.args_cli.profile:
+            self.profiler.print_report()
+        if self.args_cli.profile_json:
+            with open(self.args_cli.profile_json, 'w') as stream:
+                json.dump(self.profiler.to_dict(), stream, indent=2)
+        if self.args_cli.watch:
+            self.watch()
+
+    def watch_snapshot(self):
+        """
+        Modification time and size of every watched file: chart, tests, matrix and values files.
+        :return: dict
+        """
+        paths = chart_files(self.chart, [self.tests])
+        paths += self.test_files()
+        if self.args_cli.matrix:
+            paths.append(self.args_cli.matrix)
+        paths += [values_file for variant in self.variants.values() for values_file in variant['values']]
+        snapshot = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                continue
+        return snapshot
+
+    def watch(self):
+        """
+        Poll the chart and tests for changes and re-run only the affected tests.
+        """
+        print('==> Watching {} and {} for changes, press Ctrl-C to stop..\n'.format(self.chart, self.tests))
+        snapshot = self.watch_snapshot()
+        try:
+            while True:
+                time.sleep(self.args_cli.watch_interval)
+                current = self.watch_snapshot()
+                changed = {path for path in set(snapshot) | set(current) if snapshot.get(path) != current.get(path)}
+                if not changed:
+                    continue
+                snapshot = current
+                try:
+                    self.rerun_changes(changed)
+                except SystemExit:
+                    pass
+                except Exception as err:
+                    print('{} X {} {}\n'.format(Fore.RED, Style.RESET_ALL, err))
+                print('==> Waiting for changes..\n')
+                snapshot = self.watch_snapshot()
+        except KeyboardInterrupt:
+            print()
+
+    def rerun_changes(self, changed):
+        """
+        Reload changed test files, re-render affected variants and re-run the tests whose file or
+        target resource changed, then print the difference with the previous results.
+        """
+        started = time.perf_counter()
+        chart_changed = any(is_chart_file(self.chart, path, [self.tests]) for path in changed)
+        test_files = set(self.test_files())
+        previous_plans = dict(self.dic_tests)
+        previous_variants = dict(self.variants)
+        previous_tested = self.tested_resources()
+        previous_manifests = dict(self.manifests)
+
+        changed_tests = [path for path in changed if path in test_files or self.test_key(path) in self.dic_tests]
+        for file_name in changed_tests:
+            if file_name in test_files:
+                self.dic_tests[self.test_key(file_name)] = self.load_test_file(file_name)
+            else:
+                self.dic_tests.pop(self.test_key(file_name), None)
+        if changed_tests and self.test_cache is not None:
+            self.test_cache.save(test_files)
+        if changed_tests or self.args_cli.matrix in changed:
+            self.variants_loader()
+
+        if chart_changed or (self.args_cli.only_tested and self.tested_resources() != previous_tested):
+            rerender = list(self.variants.values())
+        else:
+            rerender = [variant for name, variant in self.variants.items()
+                        if previous_variants.get(name) != variant or
+                        any(values_file in changed for values_file in variant['values'])]
+        if chart_changed:
+            self.start_helm()
+            self.check_chart_syntax()
+        if rerender:
+            self.render_variants(rerender)
+            if self.args_cli.schemas:
+                self.validate_variants([variant['name'] for variant in rerender])
+        for name in list(self.manifests):
+            if name not in self.variants:
+                del self.manifests[name]
+
+        rerendered = {variant['name'] for variant in rerender}
+        runs = []
+        for file_name, variant_name, test_plan in self.test_runs():
+            if (file_name, variant_name) not in self.results or previous_plans.get(file_name) is not test_plan:
+                runs.append((file_name, variant_name, test_plan))
+            elif variant_name in rerendered:
+                targets = [(test['type'], test['name'], test['namespace'], test['apiVersion'])
+                           for test in test_plan['tests']]
+                previous_store = previous_manifests.get(variant_name)
+                if previous_store is None or any(previous_store.get(*target) != self.manifests[variant_name].get(*target)
+                                                 for target in targets):
+                    runs.append((file_name, variant_name, test_plan))
+        current_runs = {(file_name, variant_name) for file_name, variant_name, test_plan in self.test_runs()}
+        previous_results = self.results
+        self.results = {key: result for key, result in self.results.items() if key in current_runs}
+
+        self.evaluate_runs(runs)
+        print('{}==> Changes since previous run{} \n'.format(Fore.BLUE, Style.RESET_ALL))
+        for file_name, variant_name, test_plan in runs:
+            label = run_label(file_name, variant_name)
+            previous = previous_results.get((file_name, variant_name))
+            if previous is None:
+                print('{}+ {} (new){}'.format(Fore.GREEN, label, Style.RESET_ALL))
+                continue
+            diff = list(difflib.unified_diff(
+                [line for line in previous[0].splitlines() if line.strip()],
+                [line for line in self.results[(file_name, variant_name)][0].splitlines() if line.strip()],
+                lineterm='', n=0))
+            if not diff:
+                print('= {} (unchanged)'.format(label))
+                continue
+            print('~ {}'.format(label))
+            for line in diff[2:]:
+                if line.startswith('+'):
+                    print('  {}{}{}'.format(Fore.GREEN, line, Style.RESET_ALL))
+                elif line.startswith('-'):
+                    print('  {}{}{}'.format(Fore.RED, line, Style.RESET_ALL))
+        for key in previous_results:
+            if key not in current_runs:
+                print('{}- {} (removed){}'.format(Fore.RED, run_label(*key), Style.RESET_ALL))
+        print('\n==> {} of {} test runs re-evaluated in {:.3f}s\n'.format(
+            len(runs), len(current_runs), time.perf_counter() - started))
+        self.print_summary()
+
+
+def discover_charts(root):
+    """
+    Find chart/test pairs below root: every Chart.yaml with a unit-tests or tests directory inside the chart,
+    or with a unit-tests directory next to it when it is the only chart of its parent directory.
+    Subcharts vendored in a chart's charts/ directory are skipped.
+    :return: list of (chart, tests)
+    """
+    charts = []
+    for dir_path, dir_names, file_names in os.walk(root):
+        skipped = {'templates', '.git'}
+        if 'Chart.yaml' in file_names:
+            charts.append(dir_path)
+            skipped.add('charts')
+        dir_names[:] = sorted(name for name in dir_names if name not in skipped)
+    siblings = {}
+    for chart in charts:
+        siblings[os.path.dirname(chart)] = siblings.get(os.path.dirname(chart), 0) + 1
+    suites = []
+    for chart in charts:
+        candidates = [os.path.join(chart, 'unit-tests'), os.path.join(chart, 'tests')]
+        if siblings[os.path.dirname(chart)] == 1:
+            candidates.append(os.path.join(os.path.dirname(chart), 'unit-tests'))
+        tests = next((candidate for candidate in candidates if os.path.isdir(candidate)), None)
+        if tests is not None:
+            suites.append((chart, tests))
+    return suites
+
+
+def load_chart_list(file_name):
+    """
+    Read chart/test pairs from a YAML file of `charts: [{chart: DIR, tests: DIR}]`, relative to the file.
+    :return: list of (chart, tests)
+    """
+    with open(file_name, 'r') as stream:
+        entries = (yaml.load(stream) or {}).get('charts') or []
+    base = os.path.dirname(file_name)
+    suites = []
+    for entry in entries:
+        if not isinstance(entry, dict) or 'chart' not in entry or 'tests' not in entry:
+            raise ValueError('chart entry {} needs a chart and a tests directory'.format(entry))
+        suites.append((os.path.join(base, entry['chart']), os.path.join(base, entry['tests'])))
+    return suites
+
+
+def chart_size(chart, tests):
+    """
+    Amount of work of a chart suite, used to start the largest charts first.
+    :return: int
+    """
+    return sum(os.path.getsize(os.path.join(dir_path, file_name))
+               for directory in (chart, tests)
+               for dir_path, dir_names, file_names in os.walk(directory) for file_name in file_names)
+
+
+def init_chart_worker():
+    """
+    Create the global YAML loader in chart workers started with spawn.
+    """
+    global yaml
+    if 'yaml' not in globals():
+        yaml = YAML()
+
+
+def run_chart_suite(args_cli, helm_version):
+    """
+    Lint, render and test one chart inside a chart worker, capturing its output.
+    :return: (output, exit code, test_ok, test_ko, missing resources, profile)
+    """
+    output = io.StringIO()
+    suite = Testing(args_cli, helm_version)
+    code = 0
+    with contextlib.redirect_stdout(output):
+        try:
+            suite.run_test()
+        except SystemExit as exc:
+            code = 1 if exc.code is None else exc.code
+        except Exception as err:
+            print('{} X {} {}'.format(Fore.RED, Style.RESET_ALL, err))
+            code = 1
+        finally:
+            suite.stop_helm()
+    results = list(getattr(suite, 'results', {}).values())
+    test_ok = sum(result[1] for result in results if result[1] is not None)
+    test_ko = sum(result[2] for result in results if result[2] is not None)
+    missing = sum(1 for result in results if result[1] is None)
+    profile = suite.profiler.to_dict() if hasattr(suite, 'profiler') else {}
+    return output.getvalue(), code, test_ok, test_ko, missing, profile
+
+
+class MultiChart:
+    """
+    Run the unit tests of many charts on one bounded pool of chart workers, largest charts first.
+    """
+
+    def __init__(self, args_cli):
+        self.args_cli = args_cli
+
+    def chart_suites(self):
+        """
+        Chart/test pairs from the --charts directory or file.
+        :return: list of (chart, tests)
+        """
+        if os.path.isdir(self.args_cli.charts):
+            return discover_charts(self.args_cli.charts)
+        return load_chart_list(self.args_cli.charts)
+
+    def suite_args(self, chart, tests):
+        """
+        Cli arguments of a single chart run: its own chart and tests, no nested workers.
+        :return: argparse.Namespace
+        """
+        args_cli = argparse.Namespace(**vars(self.args_cli))
+        args_cli.chart, args_cli.tests, args_cli.charts = chart, tests, None
+        args_cli.jobs, args_cli.profile_json, args_cli.watch = 1, None, False
+        return args_cli
+
+    @staticmethod
+    def suite_labels(suites):
+        """
+        Display name of each chart/test pair, the chart alone unless it is paired with several tests directories.
+        :return: dict
+        """
+        charts = [chart for chart, tests in suites]
+        return {(chart, tests): chart if charts.count(chart) == 1 else '{} ({})'.format(chart, tests)
+                for chart, tests in suites}
+
+    def run(self):
+        """
+        Check helm once, then lint, render and test every chart and print a combined summary.
+        """
+        started = time.perf_counter()
+        try:
+            suites = list(dict.fromkeys(self.chart_suites()))
+        except Exception as err:
+            print('{} X {} {}'.format(Fore.RED, Style.RESET_ALL, err))
+            sys.exit(1)
+        if not suites:
+            print('{} X {} No chart with unit tests was found in {}'.format(
+                Fore.RED, Style.RESET_ALL, self.args_cli.charts))
+            sys.exit(1)
+        version = check_version(helm_version(helm_fingerprint(), not self.args_cli.no_cache))
+        workers = min(self.args_cli.jobs, len(suites))
+        labels = self.suite_labels(suites)
+        print('==> Testing {} chart(s) on {} worker(s)..\n'.format(len(suites), workers))
+
+        results = {}
+        # Chart suites redirect stdout, they cannot share a process as threads.
+        with worker_pool(workers, init_chart_worker, thread_safe=False) as pool:
+            futures = {}
+            for chart, tests in sorted(suites, key=lambda suite: chart_size(*suite), reverse=True):
+                futures[pool.submit(run_chart_suite, self.suite_args(chart, tests), version)] = (chart, tests)
+            for future in concurrent.futures.as_completed(futures):
+                suite = futures[future]
+                results[suite] = future.result()
+                print('{}==> {}{} \n'.format(Fore.BLUE, labels[suite], Style.RESET_ALL))
+                print(results[suite][0].rstrip('\n') + '\n', flush=True)
+
+        failed = 0
+        print('{}==> Charts Summary{} \n'.format(Fore.BLUE, Style.RESET_ALL))
+        for suite in suites:
+            output, code, test_ok, test_ko, missing, profile = results[suite]
+            passed = code == 0 and test_ko == 0 and missing == 0
+            failed += 0 if passed else 1
+            print('{}{}{} : executed {}, success {}, failed {}{}{}'.format(
+                Fore.GREEN if passed else Fore.RED, labels[suite], Style.RESET_ALL, test_ok + test_ko, test_ok, test_ko,
+                ', {} missing resource(s)'.format(missing) if missing else '',
+                '' if code == 0 else ', errored'))
+        print('\n==> {} of {} chart(s) passed in {:.3f}s\n'.format(
+            len(suites) - failed, len(suites), time.perf_counter() - started))
+        if self.args_cli.profile_json:
+            with open(self.args_cli.profile_json, 'w') as stream:
+                json.dump({'total': time.perf_counter() - started,
+                           'charts': {labels[suite]: result[5] for suite, result in results.items()}}, stream, indent=2)
+        if any(result[1] != 0 for result in results.values()):
+            sys.exit(1)
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     yaml = YAML()
     chart = Testing()
-    chart.run_test()
+    if chart.initialize_arg_parser().charts:
+        MultiChart(chart.args_cli).run()
+    else:
+        chart.run_test()
     print('+-------------------------+ '
           'Happy Helming testing day! '
           '+-------------------------+'
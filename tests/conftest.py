@@ -0,0 +1,21 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+from ruamel.yaml import YAML
+
+HELM_UNIT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'helm-unit.py')
+
+
+@pytest.fixture(scope='session')
+def helm_unit():
+    """
+    src/helm-unit.py imported as a module, with the YAML loader its cli entry point creates.
+    """
+    spec = importlib.util.spec_from_file_location('helm_unit', HELM_UNIT)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['helm_unit'] = module
+    spec.loader.exec_module(module)
+    module.yaml = YAML()
+    return module
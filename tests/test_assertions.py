@@ -0,0 +1,40 @@
+MANIFEST = '''---
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: front
+spec:
+  replicas: 3
+'''
+
+
+def evaluate(helm_unit, asserts):
+    plan = helm_unit.build_test_plan({'tests': [{'type': 'Deployment', 'name': 'front', 'asserts': asserts}]})
+    return helm_unit.evaluate_test_file('front.yaml', plan, helm_unit.load_manifests(MANIFEST), 'front')
+
+
+def test_numeric_bounds(helm_unit):
+    report, test_ok, test_ko, timings = evaluate(helm_unit, [
+        {'name': 'more than one', 'type': 'greaterThan', 'values': [{'path': 'spec.replicas', 'value': 1}]},
+        {'name': 'at most three', 'type': 'lessThan', 'values': [{'path': 'spec.replicas', 'value': 3}]},
+    ])
+    assert (test_ok, test_ko) == (1, 1)
+    assert sorted(timings['assertions']) == ['greaterThan', 'lessThan']
+
+
+def test_non_numeric_bound_only_fails_its_assertion(helm_unit):
+    report, test_ok, test_ko, timings = evaluate(helm_unit, [
+        {'name': 'more than ten', 'type': 'greaterThan', 'values': [{'path': 'spec.replicas', 'value': 'ten'}]},
+        {'name': 'less than ten', 'type': 'lessThan', 'values': [{'path': 'spec.replicas', 'value': 10}]},
+    ])
+    assert (test_ok, test_ko) == (1, 1)
+    assert "more than ten : invalid value :: value 'ten' is not a number" in report
+
+
+def test_untyped_asserts_are_not_timed(helm_unit):
+    report, test_ok, test_ko, timings = evaluate(helm_unit, [
+        {'name': 'no type', 'values': [{'path': 'spec.replicas', 'value': 3}]},
+        {'name': 'three', 'type': 'equal', 'values': [{'path': 'spec.replicas', 'value': 3}]},
+    ])
+    assert 'does not have an assert type' in report
+    assert list(timings['assertions']) == ['equal']
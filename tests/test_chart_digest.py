@@ -0,0 +1,49 @@
+import os
+
+
+def write(path, content='x'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as stream:
+        stream.write(content)
+
+
+def make_chart(path):
+    write(os.path.join(path, 'Chart.yaml'), 'apiVersion: v2\nname: app\nversion: 0.1.0\n')
+    write(os.path.join(path, 'templates', 'deployment.yaml'), 'kind: Deployment\n')
+    write(os.path.join(path, 'unit-tests', 'test-deployment.yaml'), 'tests: []\n')
+    write(os.path.join(path, '.helmignore'), '# comment\n*.swp\ndocs/\n/notes.txt\n')
+    return path
+
+
+def test_chart_files_skip_tests_and_helmignore(helm_unit, tmp_path):
+    chart = make_chart(str(tmp_path / 'app'))
+    write(os.path.join(chart, 'templates', 'service.yaml.swp'))
+    write(os.path.join(chart, 'templates', '.draft.yaml'))
+    write(os.path.join(chart, 'docs', 'usage.md'))
+    write(os.path.join(chart, 'notes.txt'))
+    write(os.path.join(chart, 'files', 'notes.txt'))
+    files = helm_unit.chart_files(chart, [os.path.join(chart, 'unit-tests')])
+    assert [os.path.relpath(path, chart) for path in files] == [
+        '.helmignore', 'Chart.yaml', os.path.join('files', 'notes.txt'), os.path.join('templates', 'deployment.yaml')]
+
+
+def test_digest_ignores_test_edits(helm_unit, tmp_path):
+    chart = make_chart(str(tmp_path / 'app'))
+    tests = os.path.join(chart, 'unit-tests')
+    digest = helm_unit.chart_digest(chart, [tests])
+    write(os.path.join(tests, 'test-deployment.yaml'), 'tests: [{}]\n')
+    write(os.path.join(chart, 'docs', 'usage.md'))
+    assert helm_unit.chart_digest(chart, [tests]) == digest
+    write(os.path.join(chart, 'templates', 'deployment.yaml'), 'kind: StatefulSet\n')
+    assert helm_unit.chart_digest(chart, [tests]) != digest
+
+
+def test_is_chart_file(helm_unit, tmp_path):
+    chart = make_chart(str(tmp_path / 'app'))
+    tests = [os.path.join(chart, 'unit-tests')]
+    assert helm_unit.is_chart_file(chart, os.path.join(chart, 'templates', 'deployment.yaml'), tests)
+    assert helm_unit.is_chart_file(chart, os.path.join(chart, 'templates', 'deleted.yaml'), tests)
+    assert not helm_unit.is_chart_file(chart, os.path.join(chart, 'unit-tests', 'test-deployment.yaml'), tests)
+    assert not helm_unit.is_chart_file(chart, os.path.join(chart, 'docs', 'usage.md'), tests)
+    assert not helm_unit.is_chart_file(chart, os.path.join(chart, 'templates', 'a.yaml.swp'), tests)
+    assert not helm_unit.is_chart_file(chart, str(tmp_path / 'values.yaml'), tests)
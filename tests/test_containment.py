@@ -0,0 +1,100 @@
+import pytest
+
+MANIFEST = '''---
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: front
+  labels:
+    app.kubernetes.io/name: front
+    app.kubernetes.io/managed-by: Helm
+    tier: web
+spec:
+  replicas: 2
+  template:
+    spec:
+      containers:
+      - name: front
+        image: nginx:1.19
+        ports:
+        - containerPort: 80
+          protocol: TCP
+        env:
+        - name: MODE
+          value: production
+      - name: sidecar
+        image: envoy:1.16
+      tolerations:
+      - dedicated
+      - gpu
+'''
+
+
+@pytest.fixture
+def check(helm_unit):
+    store = helm_unit.load_manifests(MANIFEST)
+    manifest = store.get('Deployment', 'front')
+
+    def check(assertion_type, path, value):
+        find_spec = helm_unit.compile_path(path).find(manifest)
+        expected_values = helm_unit.item_expected_values({'value': value})
+        return [passed for detail, passed in helm_unit.ASSERTIONS[assertion_type].check(find_spec, expected_values, store)]
+    return check
+
+
+def test_map_subset(check):
+    assert check('contains', '$.metadata.labels', [{'tier': 'web'}]) == [True]
+    assert check('contains', '$.metadata.labels', [{'tier': 'web', 'app.kubernetes.io/name': 'front'}]) == [True]
+    assert check('contains', '$.metadata.labels', [{'tier': 'api'}]) == [False]
+    assert check('contains', '$.metadata.labels', {'tier': 'web'}) == [True]
+
+
+def test_nested_maps(check):
+    assert check('contains', '$.spec', [{'template': {'spec': {'containers': [{'name': 'sidecar'}]}}}]) == [True]
+    assert check('contains', '$.spec', [{'template': {'spec': {'containers': [{'name': 'proxy'}]}}}]) == [False]
+    assert check('contains', '$.spec.template.spec.containers',
+                 [{'ports': [{'containerPort': 80}], 'env': [{'name': 'MODE', 'value': 'production'}]}]) == [True]
+    assert check('contains', '$.spec.template.spec.containers', [{'ports': [{'containerPort': 443}]}]) == [False]
+
+
+def test_lists(check):
+    assert check('contains', '$.spec.template.spec.tolerations', [['gpu', 'dedicated']]) == [True]
+    assert check('contains', '$.spec.template.spec.tolerations', [['gpu', 'spot']]) == [False]
+    assert check('contains', '$.spec.template.spec.containers[0]', [{'env': [{'name': 'MODE'}]}]) == [True]
+
+
+def test_key_value_strings(check):
+    assert check('contains', '$.metadata.labels', ['app.kubernetes.io/name: front', 'tier: web']) == [True, True]
+    assert check('contains', '$.metadata.labels', ['app.kubernetes.io/name:   front']) == [True]
+    assert check('contains', '$.metadata.labels', ['tier: api']) == [False]
+    assert check('contains', '$.spec.template.spec.containers', ['name: sidecar']) == [True]
+
+
+def test_item_strings(check):
+    assert check('contains', '$.spec.template.spec.tolerations', ['- gpu']) == [True]
+    assert check('contains', '$.spec.template.spec.tolerations', ['- gpu\n- dedicated']) == [True]
+    assert check('contains', '$.spec.template.spec.containers', ['- name: front\n  image: nginx:1.19']) == [True]
+    assert check('contains', '$.spec.template.spec.tolerations', ['- spot']) == [False]
+
+
+def test_scalars(check):
+    assert check('contains', '$.spec.template.spec.containers[*].image', 'envoy:1.16') == [True]
+    assert check('contains', '$.spec.template.spec.containers[*].image', 'envoy') == [False]
+    assert check('contains', '$.spec.replicas', [2]) == [True]
+    assert check('contains', '$.spec.replicas', [3]) == [False]
+    assert check('contains', '$.metadata.labels', ['tier']) == [True]
+    assert check('contains', '$.spec.template.spec.tolerations', ['gpu']) == [True]
+
+
+def test_not_contains_negates_each_value(check):
+    assert check('notContains', '$.metadata.labels', ['app.kubernetes.io/managed-by: Helm', 'tier: api']) == [False, True]
+    assert check('notContains', '$.spec', [{'template': {'spec': {'containers': [{'name': 'proxy'}]}}}]) == [True]
+    assert check('notContains', '$.spec.template.spec.tolerations', ['- gpu']) == [False]
+    assert check('notContains', '$.spec.template.spec.containers[*].image', 'nginx:latest') == [True]
+
+
+def test_parse_expected(helm_unit):
+    assert helm_unit.parse_expected('tier: web') == {'tier': 'web'}
+    assert helm_unit.parse_expected('- gpu\n- spot') == ['gpu', 'spot']
+    assert helm_unit.parse_expected('80') == 80
+    assert helm_unit.parse_expected('key: [unclosed') == 'key: [unclosed'
@@ -0,0 +1,45 @@
+import os
+
+
+def make_chart(path, tests=None):
+    os.makedirs(os.path.join(path, 'templates'))
+    with open(os.path.join(path, 'Chart.yaml'), 'w') as stream:
+        stream.write('apiVersion: v2\nname: {}\nversion: 0.1.0\n'.format(os.path.basename(path)))
+    if tests:
+        os.makedirs(os.path.join(path, tests))
+
+
+def test_charts_directory_layout(helm_unit, tmp_path):
+    make_chart(str(tmp_path / 'charts' / 'api'), 'unit-tests')
+    make_chart(str(tmp_path / 'charts' / 'web'), 'tests')
+    make_chart(str(tmp_path / 'charts' / 'untested'))
+    assert helm_unit.discover_charts(str(tmp_path)) == [
+        (str(tmp_path / 'charts' / 'api'), str(tmp_path / 'charts' / 'api' / 'unit-tests')),
+        (str(tmp_path / 'charts' / 'web'), str(tmp_path / 'charts' / 'web' / 'tests')),
+    ]
+
+
+def test_vendored_subcharts_are_skipped(helm_unit, tmp_path):
+    make_chart(str(tmp_path / 'app'), 'unit-tests')
+    make_chart(str(tmp_path / 'app' / 'charts' / 'redis'), 'tests')
+    assert helm_unit.discover_charts(str(tmp_path)) == [
+        (str(tmp_path / 'app'), str(tmp_path / 'app' / 'unit-tests'))]
+
+
+def test_sibling_tests_only_for_a_single_chart(helm_unit, tmp_path):
+    make_chart(str(tmp_path / 'single' / 'front'))
+    os.makedirs(str(tmp_path / 'single' / 'unit-tests'))
+    make_chart(str(tmp_path / 'pair' / 'one'))
+    make_chart(str(tmp_path / 'pair' / 'two'))
+    os.makedirs(str(tmp_path / 'pair' / 'unit-tests'))
+    assert helm_unit.discover_charts(str(tmp_path)) == [
+        (str(tmp_path / 'single' / 'front'), str(tmp_path / 'single' / 'unit-tests'))]
+
+
+def test_suite_labels_tell_apart_one_chart_with_two_tests_dirs(helm_unit):
+    suites = [('apps/front', 'apps/front/unit-tests'), ('apps/front', 'smoke/front'), ('apps/api', 'apps/api/tests')]
+    assert helm_unit.MultiChart.suite_labels(suites) == {
+        ('apps/front', 'apps/front/unit-tests'): 'apps/front (apps/front/unit-tests)',
+        ('apps/front', 'smoke/front'): 'apps/front (smoke/front)',
+        ('apps/api', 'apps/api/tests'): 'apps/api',
+    }
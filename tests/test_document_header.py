@@ -0,0 +1,59 @@
+import pytest
+
+SIMPLE = '''apiVersion: v1
+kind: ConfigMap
+metadata:
+  name: simple
+  namespace: prod
+data:
+  key: value
+'''
+
+FULL_PARSE = {
+    'empty name': 'apiVersion: v1\nkind: ConfigMap\nmetadata:\n  name:\n    plain-next\n',
+    'folded name': 'apiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: >-\n    folded-name\n',
+    'literal name': 'apiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: |\n    literal-name\n',
+    'single quoted name': "apiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: 'quoted'\n",
+    'double quoted namespace': 'apiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: cm\n  namespace: "prod"\n',
+    'flow metadata': 'apiVersion: v1\nkind: ConfigMap\nmetadata: {name: flow}\n',
+    'multi-line plain name': 'apiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: first\n    second\n',
+    'multi-line plain kind': 'apiVersion: v1\nkind: Config\n  Map\nmetadata:\n  name: cm\n',
+    'anchored name': 'apiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: &name anchored\n',
+    'tagged name': 'apiVersion: v1\nkind: ConfigMap\nmetadata:\n  name: !!str tagged\n',
+    'no name': 'apiVersion: v1\nkind: ConfigMap\nmetadata:\n  labels:\n    name: label\n',
+}
+
+
+def test_plain_header(helm_unit):
+    assert helm_unit.document_header(SIMPLE) == ('v1', 'ConfigMap', 'prod', 'simple')
+
+
+def test_nested_name_is_not_the_resource_name(helm_unit):
+    text = 'apiVersion: v1\nkind: ConfigMap\nmetadata:\n  labels:\n    name: label\n  name: real\n'
+    assert helm_unit.document_header(text) == ('v1', 'ConfigMap', None, 'real')
+
+
+def test_comments_and_non_string_scalars(helm_unit):
+    text = 'apiVersion: v1 # core\nkind: ConfigMap\nmetadata:\n  # the name\n  name: 42\ndata: {}\n'
+    assert helm_unit.document_header(text) == ('v1', 'ConfigMap', None, 42)
+
+
+@pytest.mark.parametrize('text', FULL_PARSE.values(), ids=list(FULL_PARSE))
+def test_unusual_layouts_need_a_full_parse(helm_unit, text):
+    assert helm_unit.document_header(text) is None
+
+
+@pytest.mark.parametrize('text', [SIMPLE] + list(FULL_PARSE.values()), ids=['simple'] + list(FULL_PARSE))
+def test_store_key_matches_full_parse(helm_unit, text):
+    store = helm_unit.ManifestStore()
+    store.add_document(text)
+    manifest = helm_unit.parse_document(text)
+    key = helm_unit.manifest_key(manifest)
+    assert store.keys() == [key]
+    assert store.resource(key) == manifest
+
+
+def test_folded_name_is_found(helm_unit):
+    store = helm_unit.load_manifests('---\n' + FULL_PARSE['folded name'] + '---\n' + FULL_PARSE['empty name'])
+    assert store.get('ConfigMap', 'folded-name') is not None
+    assert store.get('ConfigMap', 'plain-next') is not None
@@ -0,0 +1,99 @@
+import pytest
+
+
+DOCUMENTS = '''---
+apiVersion: v1
+kind: ConfigMap
+metadata:
+  name: cm
+  namespace: prod
+data:
+  env: prod
+---
+apiVersion: v1
+kind: ConfigMap
+metadata:
+  name: cm
+  namespace: dev
+data:
+  env: dev
+---
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: app
+---
+apiVersion: extensions/v1beta1
+kind: Deployment
+metadata:
+  name: app
+'''
+
+
+def test_get_by_kind_and_name(helm_unit):
+    store = helm_unit.load_manifests(DOCUMENTS)
+    assert store.get('ConfigMap', 'cm')['data']['env'] == 'prod'
+    assert store.get('ConfigMap', 'missing') is None
+
+
+def test_get_narrowed_by_namespace(helm_unit):
+    store = helm_unit.load_manifests(DOCUMENTS)
+    assert store.get('ConfigMap', 'cm', 'dev')['data']['env'] == 'dev'
+    assert store.get('ConfigMap', 'cm', 'staging') is None
+
+
+def test_get_narrowed_by_api_version_only(helm_unit):
+    store = helm_unit.load_manifests(DOCUMENTS)
+    assert store.get('ConfigMap', 'cm', None, 'v1')['data']['env'] == 'prod'
+    assert store.get('Deployment', 'app', None, 'extensions/v1beta1')['apiVersion'] == 'extensions/v1beta1'
+    assert store.get('Deployment', 'app', None, 'apps/v2') is None
+
+
+def test_get_narrowed_by_namespace_and_api_version(helm_unit):
+    store = helm_unit.load_manifests(DOCUMENTS)
+    assert store.get('ConfigMap', 'cm', 'dev', 'v1')['data']['env'] == 'dev'
+    assert store.get('ConfigMap', 'cm', 'dev', 'apps/v1') is None
+
+
+def test_get_skips_dropped_documents(helm_unit):
+    store = helm_unit.load_manifests(DOCUMENTS, only={('Deployment', 'app')})
+    assert store.get('ConfigMap', 'cm') is None
+    assert store.get('Deployment', 'app') is not None
+
+
+BROKEN = '''---
+apiVersion: v1
+kind: Service
+metadata:
+  name: front
+spec:
+  type: ClusterIP
+  type: NodePort
+---
+apiVersion: v1
+kind: ConfigMap
+metadata:
+  name: cm
+data:
+  env: prod
+'''
+
+
+def test_get_reports_invalid_document(helm_unit):
+    store = helm_unit.load_manifests(BROKEN)
+    with pytest.raises(ValueError, match='Service front'):
+        store.get('Service', 'front')
+    assert store.get('ConfigMap', 'cm')['data']['env'] == 'prod'
+
+
+def test_invalid_document_fails_its_test(helm_unit):
+    store = helm_unit.load_manifests(BROKEN)
+    plan = helm_unit.build_test_plan({'tests': [
+        {'type': 'Service', 'name': 'front', 'asserts': [
+            {'name': 'type', 'type': 'equal', 'values': [{'path': 'spec.type', 'value': 'NodePort'}]}]},
+        {'type': 'ConfigMap', 'name': 'cm', 'asserts': [
+            {'name': 'env', 'type': 'equal', 'values': [{'path': 'data.env', 'value': 'prod'}]}]},
+    ]})
+    report, test_ok, test_ko, _ = helm_unit.evaluate_test_file('front.yaml', plan, store, 'sample-front')
+    assert (test_ok, test_ko) == (1, 1)
+    assert 'rendering sample-front chart templates failed :: Service front' in report
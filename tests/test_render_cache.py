@@ -0,0 +1,30 @@
+import os
+
+
+def test_evict_bounds_every_entry_kind(helm_unit, tmp_path):
+    cache = helm_unit.RenderCache(str(tmp_path), 3 * 1024)
+    for age, suffix in enumerate(('.render', '.lint', '.tests', '.schemas', '.render')):
+        path = cache.entry_path('entry{}'.format(age), suffix)
+        with open(path, 'wb') as stream:
+            stream.write(b'x' * 1024)
+        os.utime(path, (age, age))
+    with open(str(tmp_path / 'versions.json'), 'w') as stream:
+        stream.write('{}')
+    cache.evict()
+    assert sorted(os.listdir(str(tmp_path))) == ['entry2.tests', 'entry3.schemas', 'entry4.render', 'versions.json']
+
+
+def test_plan_cache_is_written_through_the_render_cache(helm_unit, tmp_path):
+    tests = tmp_path / 'tests'
+    tests.mkdir()
+    test_file = str(tests / 'test-service.yaml')
+    with open(test_file, 'w') as stream:
+        stream.write('tests: []\n')
+    cache = helm_unit.RenderCache(str(tmp_path / 'cache'), 1 << 20)
+    test_cache = helm_unit.TestPlanCache(cache, str(tests))
+    assert test_cache.plan(test_file, lambda content: {'tests': []}) == {'tests': []}
+    test_cache.save([test_file])
+    assert helm_unit.TestPlanCache(cache, str(tests)).plan(test_file, None) == {'tests': []}
+    cache.max_size = 0
+    cache.evict()
+    assert os.listdir(str(tmp_path / 'cache')) == []
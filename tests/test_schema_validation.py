@@ -0,0 +1,168 @@
+import json
+import os
+import re
+
+import pytest
+
+DEFINITIONS = {
+    'definitions': {
+        'io.k8s.api.core.v1.Container': {
+            'type': 'object',
+            'required': ['name'],
+            'properties': {
+                'name': {'type': 'string', 'pattern': '^[a-z0-9-]+$', 'maxLength': 63},
+                'ports': {'type': 'array', 'items': {'$ref': '#/definitions/io.k8s.api.core.v1.ContainerPort'}},
+            },
+        },
+        'io.k8s.api.core.v1.ContainerPort': {
+            'type': 'object',
+            'properties': {'containerPort': {'type': 'integer', 'format': 'int32', 'minimum': 1, 'maximum': 65535}},
+        },
+    },
+}
+
+DEPLOYMENT = {
+    'type': 'object',
+    'additionalProperties': False,
+    'properties': {
+        'apiVersion': {'type': 'string', 'const': 'apps/v1'},
+        'kind': {'type': 'string'},
+        'metadata': {
+            'type': 'object',
+            'properties': {'name': {'type': 'string', 'minLength': 1}},
+            'patternProperties': {'^x-': {'type': 'string'}},
+            'additionalProperties': {'type': 'object'},
+        },
+        'spec': {
+            'type': 'object',
+            'properties': {
+                'replicas': {'type': 'integer', 'not': {'enum': [13]}},
+                'containers': {
+                    'type': 'array', 'minItems': 1, 'uniqueItems': True,
+                    'items': {'$ref': '_definitions.json#/definitions/io.k8s.api.core.v1.Container'},
+                },
+                'strategy': {'oneOf': [{'required': ['rollingUpdate']}, {'required': ['recreate']}]},
+                'selector': {'anyOf': [{'required': ['matchLabels']}, {'required': ['matchExpressions']}]},
+                'template': {'allOf': [{'required': ['metadata']}, {'required': ['spec']}]},
+                'labels': {'type': 'object', 'x-kubernetes-preserve-unknown-fields': True, 'additionalProperties': False},
+                'ttl': {'type': 'integer', 'dependentRequired': {}},
+            },
+        },
+    },
+}
+
+
+def valid_deployment():
+    return {
+        'apiVersion': 'apps/v1',
+        'kind': 'Deployment',
+        'metadata': {'name': 'front', 'x-team': 'web', 'annotations': {}},
+        'spec': {
+            'replicas': 2,
+            'containers': [{'name': 'front', 'ports': [{'containerPort': 80}]}],
+            'strategy': {'rollingUpdate': {}},
+            'selector': {'matchLabels': {}},
+            'template': {'metadata': {}, 'spec': {}},
+            'labels': {'anything': 'goes'},
+        },
+    }
+
+
+@pytest.fixture
+def validators(helm_unit, tmp_path):
+    schemas = write_schemas(tmp_path / 'schemas', {'_definitions.json': DEFINITIONS, 'deployment-apps-v1.json': DEPLOYMENT})
+    return helm_unit.SchemaValidators(helm_unit.schema_index(schemas))
+
+
+def write_schemas(path, schemas):
+    path.mkdir()
+    for name, schema in schemas.items():
+        with open(os.path.join(str(path), name), 'w') as stream:
+            json.dump(schema, stream)
+    return str(path)
+
+
+def validate(validators, manifest):
+    errors = []
+    validators.validator('apps/v1', 'Deployment')(manifest, '', errors)
+    return errors
+
+
+def test_valid_manifest(validators):
+    assert validate(validators, valid_deployment()) == []
+
+
+def test_refs_are_resolved_across_files(validators):
+    manifest = valid_deployment()
+    manifest['spec']['containers'] = [{'name': 'Front_1', 'ports': [{'containerPort': 70000}]}, {'ports': []},
+                                      {'name': 'sidecar', 'ports': [{'containerPort': 2 ** 31}]}]
+    assert validate(validators, manifest) == [
+        "spec.containers[0].name: 'Front_1' does not match ^[a-z0-9-]+$",
+        'spec.containers[0].ports[0].containerPort: 70000 is greater than 65535',
+        'spec.containers[1]: missing required field name',
+        'spec.containers[2].ports[0].containerPort: 2147483648 is not a valid int32',
+        'spec.containers[2].ports[0].containerPort: 2147483648 is greater than 65535',
+    ]
+
+
+def test_additional_properties(validators):
+    manifest = valid_deployment()
+    manifest['status'] = {}
+    manifest['metadata']['x-owner'] = 3
+    manifest['metadata']['labels'] = 'app=front'
+    manifest['spec']['labels']['more'] = 1
+    assert validate(validators, manifest) == [
+        'metadata.x-owner: expected string, got int',
+        'metadata.labels: expected object, got str',
+        'status: unknown field',
+    ]
+
+
+def test_combinators(validators):
+    manifest = valid_deployment()
+    manifest['spec']['strategy'] = {'rollingUpdate': {}, 'recreate': {}}
+    manifest['spec']['selector'] = {}
+    manifest['spec']['template'] = {}
+    assert validate(validators, manifest) == [
+        'spec.strategy: must match exactly one schema, matched 2',
+        'spec.selector: does not match any allowed schema',
+        'spec.template: missing required field metadata',
+        'spec.template: missing required field spec',
+    ]
+
+
+def test_value_constraints(validators):
+    manifest = valid_deployment()
+    manifest['apiVersion'] = 'apps/v2'
+    manifest['metadata']['name'] = ''
+    manifest['spec']['replicas'] = 13
+    manifest['spec']['containers'] = []
+    assert validate(validators, manifest) == [
+        "apiVersion: 'apps/v2' is not 'apps/v1'",
+        "metadata.name: '' is shorter than 1",
+        'spec.replicas: must not match the schema',
+        'spec.containers: [] has fewer items than 1',
+    ]
+
+
+def test_unsupported_keywords_are_reported(validators):
+    validate(validators, valid_deployment())
+    assert validators.unsupported == {'dependentRequired'}
+
+
+def test_index_is_only_cached_with_a_cache(helm_unit, tmp_path):
+    schemas = write_schemas(tmp_path / 'schemas', {'_definitions.json': DEFINITIONS, 'deployment-apps-v1.json': DEPLOYMENT})
+    helm_unit.schema_index(schemas)
+    assert not (tmp_path / 'cache').exists()
+    cache = helm_unit.RenderCache(str(tmp_path / 'cache'), 1 << 20)
+    index = helm_unit.schema_index(schemas, cache)
+    assert [path.suffix for path in (tmp_path / 'cache').iterdir()] == ['.schemas']
+    assert helm_unit.schema_index(schemas, cache) == index
+
+
+def test_missing_ref_names_file_and_ref(helm_unit, tmp_path):
+    schemas = write_schemas(tmp_path / 'schemas', {'_definitions.json': {'definitions': {}},
+                                                   'deployment-apps-v1.json': DEPLOYMENT})
+    message = 'deployment-apps-v1.json: cannot resolve $ref _definitions.json#/definitions/io.k8s.api.core.v1.Container'
+    with pytest.raises(ValueError, match=re.escape(message)):
+        helm_unit.schema_index(schemas)